@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+#
+# Print convergence time of each flow arrival in convergence exp data.
+
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+import numpy as np
+from lib.iperf_loader import load_iperf_dir
+from lib.convergence import dumbbell_schedule, analyze_runs
+
+EXP_DATA_DIR_FILE = './exp_data_dir'
+FLOW_ENTER_INTERVAL_FILE = './flow_enter_interval'
+DUMBBELL_PAIRS_FILE = './dumbbell_pairs'
+GROUP_FLOWS_FILE = './group_flows'
+project_names = ['AFQ', 'A2FQ']
+measure_side = 'server'
+use_cache = True    # cache parsed data in <exp_data_dir>/.iperf_cache
+tolerance = 0.1     # converged when within +-10% of fair share
+
+def read_first_line(filepath: str) -> str:
+    with open(filepath, 'r', encoding='utf-8') as f:
+        return f.readline().rstrip('\n')
+
+exp_data_dir = read_first_line(EXP_DATA_DIR_FILE)
+flow_enter_interval = int(read_first_line(FLOW_ENTER_INTERVAL_FILE))
+dumbbell_pairs = int(read_first_line(DUMBBELL_PAIRS_FILE))
+group_flows = int(read_first_line(GROUP_FLOWS_FILE))
+
+offsets, durations = dumbbell_schedule(dumbbell_pairs, flow_enter_interval,
+                                       group_flows)
+iperf_datas = load_iperf_dir(exp_data_dir, project_names, [measure_side],
+                             use_cache=use_cache, columns=True)
+runs = []
+for project in project_names:
+    runs.append({
+        'iperf_datas': [iperf_datas[(project, measure_side, id)]
+                        for id in range(1, dumbbell_pairs + 1)],
+        'offsets': offsets,
+        'durations': durations,
+    })
+metrics = analyze_runs(runs, tolerance=tolerance)
+
+print('project time flows convergence_time(s) overshoot settling_var')
+arrival = metrics['arrivals'] > 0
+for i in np.nonzero(arrival)[0]:
+    print('%s %.1f %d %.2f %.3f %.5f' % (
+        project_names[metrics['run'][i]], metrics['time'][i],
+        metrics['flows'][i], metrics['convergence_time'][i],
+        metrics['overshoot'][i], metrics['settling_var'][i]
+    ))
+for run_index, project in enumerate(project_names):
+    selected = arrival & (metrics['run'] == run_index)
+    print('%s mean convergence time: %.2fs' % (
+        project, np.nanmean(metrics['convergence_time'][selected])
+    ))
@@ -4,17 +4,13 @@
 # Author: Guangyu Peng (gypeng2021@163.com)
 
 import sys, os
+import numpy as np
 sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
 from lib.iperf_data import *
-from lib.iperf_parser import IperfParser
+from lib.iperf_loader import load_iperf_dir
+from lib.fairness import jain_index
+from lib.rate_matrix import build_aligned_rate_matrix
 
-def get_fairness_index(flow_rates: list):
-    n = len(flow_rates)
-    val_sum = sum(flow_rates)
-    square_sum = sum(i*i for i in flow_rates)
-    return (val_sum**2) / (n*square_sum)
-
-FILE_PATTERN = '%s_%s_%d'
 EXP_DATA_DIR_FILE = './exp_data_dir'
 FLOW_ENTER_INTERVAL_FILE = './flow_enter_interval'
 DUMBBELL_PAIRS_FILE = './dumbbell_pairs'
@@ -22,6 +18,7 @@ GROUP_FLOWS_FILE = './group_flows'
 project_names = ['AFQ', 'A2FQ']
 #project_names = ['basic']
 measure_sides = ['server']
+use_cache = True    # cache parsed data in <exp_data_dir>/.iperf_cache
 exp_data_dir = None
 flow_enter_interval = None
 dumbbell_pairs = None
@@ -120,7 +117,6 @@ exp_datas = [
     }
 ]
 
-iperf_parser = IperfParser()
 percent_max = 0
 percent_min = 100
 
@@ -131,38 +127,42 @@ for exp_data in exp_datas:
     dumbbell_pairs = exp_data["dumbbell_pairs"]
     group_num = int(dumbbell_pairs / group_flows)
 
+    iperf_datas = load_iperf_dir(exp_data_dir, project_names, measure_sides,
+                                 use_cache=use_cache, columns=True)
     fairness_indexes = []
     for project in project_names:
         for measure_side in measure_sides:
             id = 1
-            flow_rates = []
+            flow_datas = []
+            offsets = []
 
             while True:
-                file_path = exp_data_dir + '/' + \
-                            FILE_PATTERN  % (project, measure_side, id)
-                if not os.path.exists(file_path):
+                if (project, measure_side, id) not in iperf_datas:
                     break
 
                 group_id = int((id + group_flows - 1) / group_flows)
-                lasting_time = ((group_num-1)*2+1-(group_id-1)*2 )*flow_enter_interval
-                lasting_time = int(lasting_time)
-
-                iperf_data = iperf_parser.iperf_parse(file_path)
-                bandwidth_list = iperf_data.get_bandwidth_list(unit='Mbps', 
-                                                            begin=0, end=2*lasting_time+1)
-                
-                # get bandwidth when all flows is active
-                left_strip = (group_num - group_id) * flow_enter_interval
-                left_index = 2*left_strip
-                right_index = 2*left_strip+2*flow_enter_interval+1
-                bandwidth_list = bandwidth_list[left_index:right_index]
-                
-                avg_rate = sum(bandwidth_list) / len(bandwidth_list)
-                flow_rates.append(avg_rate)
+                offsets.append((group_id-1) * flow_enter_interval)
+                flow_datas.append(iperf_datas[(project, measure_side, id)])
 
                 id = id + 1
 
-            fairness = get_fairness_index(flow_rates)
+            # get bandwidth when all flows is active, i.e. after the last
+            # group starts and before the first group stops
+            all_active_begin = (group_num-1) * flow_enter_interval
+            _, rate_matrix = build_aligned_rate_matrix(
+                flow_datas, offsets, step=flow_enter_interval,
+                t_begin=all_active_begin,
+                t_end=all_active_begin+flow_enter_interval
+            )
+            flow_rates = rate_matrix[:, 0]
+            missing = int(np.isnan(flow_rates).sum())
+            if missing > 0:
+                raise ValueError('%s: %d of %d %s flows do not cover %g-%g sec!'
+                                 % (exp_data_dir, missing, len(flow_rates),
+                                    project, all_active_begin,
+                                    all_active_begin+flow_enter_interval))
+
+            fairness = jain_index(flow_rates)
             fairness_indexes.append(fairness)
         
     increase_percent = (fairness_indexes[1]-fairness_indexes[0]) * 100 / \
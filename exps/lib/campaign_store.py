@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+#
+# Columnar store of the results of whole experiment campaigns.
+#
+# Each experiment data directory is ingested once: its `parameters` file
+# and all per-flow iperf series are saved as one .npz file of columns,
+# and the parameters go to an index, so runs can be selected by
+# parameter values without touching the text files again.
+#
+# Store layout:
+#     <store_dir>/runs.json       index, run_id -> run record
+#     <store_dir>/<run_id>.npz    series of all flows of a run
+
+import sys, os
+import argparse
+import json
+from multiprocessing import Pool
+import re
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import numpy as np
+
+from lib.iperf_column_data import IperfColumnData
+from lib.iperf_loader import find_iperf_files
+from lib.iperf_parser import IperfParser
+
+INDEX_FILE_NAME = 'runs.json'
+PARAMETERS_FILE_NAME = 'parameters'
+STORE_VERSION = 1
+
+# [readonly] name=value [# comment]
+PARAMETER_LINE_RE = re.compile(r'^\s*(?:readonly\s+)?(\w+)=(.*)$')
+
+def _coerce(value: str):
+    for convert in (int, float):
+        try:
+            return convert(value)
+        except ValueError:
+            pass
+    return value
+
+def parse_parameters(filepath: str) -> dict:
+    """Read the variables of a run.sh `parameters` file.
+
+    Numbers are converted to int or float, other values such as '200KB'
+    are kept as strings, bash arrays become lists. Commented lines and
+    variables assigned a value expanded by the shell, e.g.
+    ${exp_data_dir}, are skipped.
+
+    Returns:
+        dict, name -> value
+    """
+    parameters = {}
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for line in f:
+            m = PARAMETER_LINE_RE.match(line)
+            if m is None:
+                continue
+            name, value = m.group(1), m.group(2).strip()
+            if value.startswith('"'):
+                value = value[1:value.find('"', 1)]
+            elif value.startswith('('):
+                value = [item.strip('"\'') for item
+                         in value[1:value.find(')')].split()]
+            else:
+                value = value.split('#', 1)[0].strip()
+            if '$' in str(value):
+                # value unknown without a shell, forget older ones too
+                parameters.pop(name, None)
+                continue
+            parameters[name] = value if isinstance(value, list) \
+                               else _coerce(value)
+    return parameters
+
+def _parse_columns(filepath: str) -> IperfColumnData:
+    return IperfColumnData.from_entries(IperfParser().iter_entries(filepath))
+
+def _match(value, condition) -> bool:
+    if callable(condition):
+        return bool(condition(value))
+    if isinstance(condition, (list, tuple, set, frozenset)):
+        return value in condition
+    return value == condition
+
+class CampaignStore:
+    """Experiment runs of a campaign and their per-flow iperf series.
+
+       Attributes:
+           store_dir : str      // directory of the store
+           runs : dict          // run_id -> run record, a dict with
+                                // 'data_dir', 'parameters', 'flows',
+                                // 'projects'
+    """
+
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+        self.runs = {}
+        index_path = os.path.join(store_dir, INDEX_FILE_NAME)
+        if os.path.exists(index_path):
+            with open(index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            if index.get('version') != STORE_VERSION:
+                raise ValueError('%s: unsupported store version!'
+                                 % index_path)
+            self.runs = index['runs']
+
+    def __save_index(self):
+        os.makedirs(self.store_dir, exist_ok=True)
+        index_path = os.path.join(self.store_dir, INDEX_FILE_NAME)
+        tmp_path = '%s.%d.tmp' % (index_path, os.getpid())
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': STORE_VERSION, 'runs': self.runs}, f,
+                      indent=1, sort_keys=True)
+        os.replace(tmp_path, index_path)
+
+    def __get_series_path(self, run_id: str) -> str:
+        return os.path.join(self.store_dir, run_id + '.npz')
+
+    def find_run(self, data_dir: str):
+        """run_id of an ingested data directory, or None."""
+        data_dir = os.path.abspath(data_dir)
+        for run_id, run in self.runs.items():
+            if run['data_dir'] == data_dir:
+                return run_id
+        return None
+
+    def ingest(self, data_dir: str, run_id=None, processes=None,
+               overwrite=False):
+        """Parse one experiment data directory into the store.
+
+        Parameters:
+            data_dir: string, directory with iperf data files and,
+                      optionally, the `parameters` file of the run
+            run_id: string, None for the name of data_dir
+            processes: int, parser pool size, None for os.cpu_count()
+            overwrite: bool, parse again if data_dir is already ingested
+        Returns:
+            run_id
+        """
+        data_dir = os.path.abspath(data_dir)
+        known_id = self.find_run(data_dir)
+        if known_id is not None and not overwrite:
+            return known_id
+        if run_id is None:
+            run_id = known_id if known_id is not None \
+                     else os.path.basename(data_dir)
+        if run_id in self.runs and self.runs[run_id]['data_dir'] != data_dir:
+            raise ValueError('run_id %s already used by %s!'
+                             % (run_id, self.runs[run_id]['data_dir']))
+
+        parameters_path = os.path.join(data_dir, PARAMETERS_FILE_NAME)
+        parameters = parse_parameters(parameters_path) \
+                     if os.path.exists(parameters_path) else {}
+        files = find_iperf_files(data_dir)
+        keys = sorted(files)
+        paths = [files[key] for key in keys]
+        if processes == 1 or len(paths) <= 1:
+            columns = [_parse_columns(path) for path in paths]
+        else:
+            with Pool(processes=processes) as pool:
+                columns = pool.map(_parse_columns, paths)
+
+        # all flows in one set of columns, flow k owns rows
+        # [row_begins[k], row_begins[k+1])
+        sizes = [column_data.size() for column_data in columns]
+        row_begins = np.concatenate(([0], np.cumsum(sizes, dtype=np.int64)))
+
+        def concat(name, dtype):
+            if len(columns) == 0:
+                return np.empty(0, dtype=dtype)
+            return np.concatenate([getattr(column_data, name)
+                                   for column_data in columns])
+
+        os.makedirs(self.store_dir, exist_ok=True)
+        series_path = self.__get_series_path(run_id)
+        tmp_path = '%s.%d.tmp' % (series_path, os.getpid())
+        with open(tmp_path, 'wb') as f:
+            np.savez(f,
+                     version=STORE_VERSION,
+                     projects=np.array([key[0] for key in keys],
+                                       dtype=np.str_),
+                     sides=np.array([key[1] for key in keys], dtype=np.str_),
+                     flow_ids=np.array([key[2] for key in keys],
+                                       dtype=np.int64),
+                     row_begins=row_begins,
+                     start_times=concat('start_times', np.float64),
+                     end_times=concat('end_times', np.float64),
+                     transfer_bytes=concat('transfer_bytes', np.int64),
+                     bandwidths=concat('bandwidths', np.float64))
+        os.replace(tmp_path, series_path)
+
+        self.runs[run_id] = {
+            'data_dir': data_dir,
+            'parameters': parameters,
+            'flows': len(keys),
+            'projects': sorted(set(key[0] for key in keys)),
+        }
+        self.__save_index()
+        return run_id
+
+    def ingest_campaign(self, data_root: str, processes=None):
+        """Ingest every run directory under data_root that is not in the
+        store yet. A run directory is one holding a `parameters` file.
+
+        Returns:
+            list of run_id of the newly ingested runs
+        """
+        new_ids = []
+        for dirpath, dirnames, filenames in os.walk(data_root):
+            dirnames.sort()
+            if PARAMETERS_FILE_NAME not in filenames:
+                continue
+            if self.find_run(dirpath) is None:
+                new_ids.append(self.ingest(dirpath, processes=processes))
+        return new_ids
+
+    def select(self, **conditions):
+        """run_ids whose parameters match all conditions, sorted.
+
+        Each condition is parameter_name=value for equality, a list, tuple
+        or set of accepted values, or a function of the value returning
+        bool, e.g.
+            store.select(queues_per_port=32,
+                         dumbbell_pairs=lambda n: n >= 18,
+                         udp_bandwidth=['8M', '9M'])
+        Runs without a parameter never match a condition on it.
+        """
+        run_ids = []
+        for run_id, run in self.runs.items():
+            parameters = run['parameters']
+            if all(name in parameters and _match(parameters[name], condition)
+                   for name, condition in conditions.items()):
+                run_ids.append(run_id)
+        return sorted(run_ids)
+
+    def load_run(self, run_id: str, project_names=None, measure_sides=None):
+        """Series of the flows of one run.
+
+        Returns:
+            dict, (project, side, flow_id) -> IperfColumnData, like
+            load_iperf_dir()
+        """
+        if run_id not in self.runs:
+            raise KeyError('no run %s in store!' % run_id)
+        with np.load(self.__get_series_path(run_id),
+                     allow_pickle=False) as npz:
+            arrays = {name: npz[name] for name in npz.files}
+        row_begins = arrays['row_begins']
+        all_flows = IperfColumnData(arrays['start_times'],
+                                    arrays['end_times'],
+                                    arrays['transfer_bytes'],
+                                    arrays['bandwidths'])
+        flows = {}
+        for k, key in enumerate(zip(arrays['projects'].tolist(),
+                                    arrays['sides'].tolist(),
+                                    arrays['flow_ids'].tolist())):
+            if project_names is not None and key[0] not in project_names:
+                continue
+            if measure_sides is not None and key[1] not in measure_sides:
+                continue
+            flows[key] = all_flows.slice(int(row_begins[k]),
+                                         int(row_begins[k + 1]))
+        return flows
+
+    def query(self, project_names=None, measure_sides=None, **conditions):
+        """Yield (run_id, parameters, flows) of every run matching
+        conditions, see select() and load_run().
+        """
+        for run_id in self.select(**conditions):
+            yield run_id, self.runs[run_id]['parameters'], \
+                  self.load_run(run_id, project_names, measure_sides)
+
+def _parse_condition(text: str):
+    name, _, value = text.partition('=')
+    values = [_coerce(v) for v in value.split(',')]
+    return name, values[0] if len(values) == 1 else values
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description='Ingest experiment runs and select them by parameters.')
+    parser.add_argument('-s', '--store', required=True,
+                        help='store directory')
+    parser.add_argument('-i', '--ingest', action='append', default=[],
+                        help='data root to ingest, repeatable')
+    parser.add_argument('-q', '--query', nargs='*', default=None,
+                        help='conditions like dumbbell_pairs=18,21')
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = get_args()
+
+    store = CampaignStore(args.store)
+    for data_root in args.ingest:
+        for run_id in store.ingest_campaign(data_root):
+            print('ingested', run_id)
+    if args.query is not None:
+        conditions = dict(_parse_condition(c) for c in args.query)
+        for run_id in store.select(**conditions):
+            run = store.runs[run_id]
+            print(run_id, run['flows'], json.dumps(run['parameters'],
+                                                   sort_keys=True))
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+#
+# Convergence metrics of flows in dumbbell convergence experiments.
+
+import numpy as np
+
+from lib.rate_matrix import build_aligned_rate_matrix, TIME_EPS
+
+def dumbbell_schedule(dumbbell_pairs: int, flow_enter_interval: float,
+                      group_flows=1):
+    """Start time and duration of each flow, the same as client.sh.
+
+    Groups of group_flows flows enter one group every flow_enter_interval
+    seconds, then leave in reverse order.
+
+    Returns:
+        (offsets, durations), lists of float indexed by flow_id-1, unit:sec
+    """
+    group_num = dumbbell_pairs // group_flows
+    offsets = []
+    durations = []
+    for flow_id in range(1, dumbbell_pairs + 1):
+        group_id = (flow_id + group_flows - 1) // group_flows
+        offsets.append((group_id - 1) * flow_enter_interval)
+        durations.append(((group_num - 1) * 2 + 1 - (group_id - 1) * 2)
+                         * flow_enter_interval)
+    return offsets, durations
+
+def infer_interval(iperf_data) -> float:
+    """Iperf report interval of a trace, unit:sec."""
+    starts = np.asarray(iperf_data.get_start_time_nums(), dtype=np.float64)
+    ends = np.asarray(iperf_data.get_end_time_nums(), dtype=np.float64)
+    return float(np.median(ends - starts))
+
+def convergence_metrics(edges, rate_matrix, offsets: list, durations: list,
+                        tolerance=0.1, capacity=None):
+    """Convergence metrics after every change of the set of active flows.
+
+    The experiment is cut into epochs at each flow arrival or departure.
+    Within an epoch every active flow has the same fair share, which is
+    capacity / n if capacity is given, otherwise the mean rate of the
+    active flows in each slot. An epoch converges at the first slot from
+    which every active flow stays within +-tolerance of its fair share
+    until the epoch ends.
+
+    Parameters:
+        edges, rate_matrix: output of build_aligned_rate_matrix()
+        offsets, durations: list of float, schedule of each flow, unit:sec
+        tolerance: float, e.g. 0.1 for +-10% of fair share
+        capacity: float, bottleneck rate in the unit of rate_matrix
+    Returns:
+        dict of np.ndarray, one value per epoch:
+            'time': epoch begin, unit:sec
+            'arrivals': number of flows starting at 'time'
+            'departures': number of flows stopping at 'time'
+            'flows': number of active flows
+            'convergence_time': seconds from 'time' until converged,
+                                NaN if never converged in the epoch
+            'overshoot': max (rate - share) / share over the epoch
+            'settling_var': variance of rate / share - 1 after converging
+    """
+    edges = np.asarray(edges, dtype=np.float64)
+    rate_matrix = np.asarray(rate_matrix, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.float64)
+    stops = offsets + np.asarray(durations, dtype=np.float64)
+    slot_begins = edges[:-1]
+    slot_ends = edges[1:]
+    slots = len(slot_begins)
+
+    # flows x slots, True where the schedule says the flow is active
+    active = (offsets[:, None] <= slot_begins[None, :] + TIME_EPS) & \
+             (stops[:, None] >= slot_ends[None, :] - TIME_EPS)
+    # a scheduled flow without reports counts as sending nothing
+    rates = np.where(active, np.nan_to_num(rate_matrix, nan=0.0), np.nan)
+    n = active.sum(axis=0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if capacity is None:
+            share = np.nansum(rates, axis=0) / n
+        else:
+            share = capacity / n
+        deviation = rates / share[None, :] - 1.0
+    in_band = np.all(np.isnan(deviation) | (np.abs(deviation) <= tolerance),
+                     axis=0) & (n > 0)
+    slot_overshoot = np.nanmax(np.where(active, deviation, -np.inf), axis=0,
+                               initial=-np.inf)
+
+    # epochs begin at every arrival or departure inside the grid
+    change_times = np.unique(np.concatenate((offsets, stops)))
+    change_times = change_times[(change_times >= edges[0] - TIME_EPS) &
+                                (change_times < edges[-1] - TIME_EPS)]
+    epochs = len(change_times)
+    slot_epoch = np.searchsorted(change_times, slot_begins + TIME_EPS,
+                                 side='right') - 1
+    in_epoch = slot_epoch >= 0
+    slot_index = np.arange(slots)
+
+    # last slot outside the band of each epoch, -1 if none
+    last_bad = np.full(epochs, -1)
+    bad = in_epoch & ~in_band
+    np.maximum.at(last_bad, slot_epoch[bad], slot_index[bad])
+    first_slot = np.full(epochs, slots)
+    np.minimum.at(first_slot, slot_epoch[in_epoch], slot_index[in_epoch])
+    last_slot = np.full(epochs, -1)
+    np.maximum.at(last_slot, slot_epoch[in_epoch], slot_index[in_epoch])
+
+    converged_slot = np.maximum(last_bad + 1, first_slot)
+    converged = converged_slot <= last_slot
+    convergence_time = np.full(epochs, np.nan)
+    convergence_time[converged] = \
+        slot_begins[converged_slot[converged]] - change_times[converged]
+
+    overshoot = np.full(epochs, -np.inf)
+    np.maximum.at(overshoot, slot_epoch[in_epoch], slot_overshoot[in_epoch])
+    overshoot[np.isinf(overshoot)] = np.nan
+
+    # variance of normalized rates over the settled part of each epoch
+    settled = in_epoch & (slot_index >= converged_slot[slot_epoch])
+    settled_dev = np.where(settled[None, :] & active, deviation, np.nan)
+    dev_sum = np.zeros(epochs)
+    dev_square_sum = np.zeros(epochs)
+    dev_num = np.zeros(epochs)
+    np.add.at(dev_sum, slot_epoch[settled],
+              np.nansum(settled_dev, axis=0)[settled])
+    np.add.at(dev_square_sum, slot_epoch[settled],
+              np.nansum(settled_dev ** 2, axis=0)[settled])
+    np.add.at(dev_num, slot_epoch[settled],
+              np.sum(~np.isnan(settled_dev), axis=0)[settled])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        dev_mean = dev_sum / dev_num
+        settling_var = dev_square_sum / dev_num - dev_mean ** 2
+
+    return {
+        'time': change_times,
+        'arrivals': np.sum(np.isclose(offsets[None, :],
+                                      change_times[:, None]), axis=1),
+        'departures': np.sum(np.isclose(stops[None, :],
+                                        change_times[:, None]), axis=1),
+        'flows': np.sum(
+            (offsets[None, :] <= change_times[:, None] + TIME_EPS) &
+            (stops[None, :] > change_times[:, None] + TIME_EPS), axis=1
+        ),
+        'convergence_time': convergence_time,
+        'overshoot': overshoot,
+        'settling_var': settling_var,
+    }
+
+def analyze_runs(runs: list, tolerance=0.1, capacity=None, step=None):
+    """Convergence metrics of many runs, concatenated.
+
+    Parameters:
+        runs: list of dict, each with
+              'iperf_datas': list of IperfData indexed by flow_id-1,
+              'offsets', 'durations': see dumbbell_schedule()
+        step: float, grid step, unit:sec, None for the iperf interval of
+              the first flow of each run
+    Returns:
+        dict of np.ndarray like convergence_metrics(), plus 'run', the
+        index of the run in runs
+    """
+    results = []
+    for run_index, run in enumerate(runs):
+        iperf_datas = run['iperf_datas']
+        run_step = step if step is not None else \
+                   infer_interval(iperf_datas[0])
+        stops = [offset + duration for offset, duration
+                 in zip(run['offsets'], run['durations'])]
+        edges, rate_matrix = build_aligned_rate_matrix(
+            iperf_datas, run['offsets'], run_step, t_end=max(stops)
+        )
+        metrics = convergence_metrics(edges, rate_matrix, run['offsets'],
+                                      run['durations'], tolerance, capacity)
+        metrics['run'] = np.full(len(metrics['time']), run_index)
+        results.append(metrics)
+    if len(results) == 0:
+        return {}
+    return {key: np.concatenate([metrics[key] for metrics in results])
+            for key in results[0]}
@@ -1,9 +1,20 @@
 """Tools for .csv data files.
 
+Files whose name ends with '.gz' are read and written gzip compressed by
+the streaming functions below, unless compress says otherwise.
+
 Author: Guangyu Peng
 """
 
 import csv
+import gzip
+import warnings
+from itertools import islice
+
+import numpy as np
+
+# Rows written per batch by the streaming writers.
+CHUNK_ROWS = 64 * 1024
 
 def read_csv(filepath, ignore_title=False, delimiter=','):
     csv_data = []
@@ -22,4 +33,143 @@ def write_csv(filepath, title, rows_list,
         if not ignore_title:
             csv_writer.writerow(title)
         for row in rows_list:
-            csv_writer.writerow(row)
\ No newline at end of file
+            csv_writer.writerow(row)
+
+def _open_csv(filepath, mode, compress=None):
+    if compress is None:
+        compress = str(filepath).endswith('.gz')
+    if compress:
+        return gzip.open(filepath, mode + 't', newline='')
+    return open(filepath, mode, newline='')
+
+def _get_converters(schema, title):
+    # schema: list of callables by column, or dict of column name ->
+    # callable, columns missing from the dict are kept as str
+    if schema is None:
+        return None
+    if isinstance(schema, dict):
+        if title is None:
+            raise ValueError('a dict schema needs the title row!')
+        unknown = set(schema) - set(title)
+        if unknown:
+            raise ValueError('columns %s not in title!' % sorted(unknown))
+        return [schema.get(name, str) for name in title]
+    return list(schema)
+
+def iter_csv(filepath, schema=None, ignore_title=False, delimiter=',',
+             compress=None):
+    """Yield the rows of a csv file one by one.
+
+    Parameters:
+        schema: None to yield lists of str, otherwise a list of types,
+                e.g. [float, int, str], or a dict of column name -> type,
+                which reads the column names from the title row
+        ignore_title: skip the title row
+        compress: None to guess gzip from the file name, True or False
+    """
+    with _open_csv(filepath, 'r', compress) as csvfile:
+        csv_reader = csv.reader(csvfile, delimiter=delimiter)
+        title = None
+        if ignore_title or isinstance(schema, dict):
+            title = next(csv_reader, None)
+            if title is None:
+                return
+        converters = _get_converters(schema, title)
+        if converters is None:
+            yield from csv_reader
+            return
+        for row in csv_reader:
+            yield [convert(value) for convert, value in zip(converters, row)]
+
+def read_csv_columns(filepath, schema: dict, delimiter=',', compress=None):
+    """Read numeric columns of a csv file with a title row into numpy
+    arrays.
+
+    The rows are parsed by numpy's C loader straight into the given
+    dtypes, no python object is built per value.
+
+    Parameters:
+        schema: dict of column name -> numeric dtype,
+                e.g. {'Time(s)': float, 'flow': int}, only these columns
+                are returned
+    Returns:
+        dict of column name -> np.ndarray
+    """
+    with _open_csv(filepath, 'r', compress) as csvfile:
+        title = next(csv.reader(csvfile, delimiter=delimiter), None)
+        if title is None:
+            raise ValueError('no title row in %s!' % filepath)
+        _get_converters(schema, title)
+        with warnings.catch_warnings():
+            # an empty body is not an error here
+            warnings.simplefilter('ignore', UserWarning)
+            table = np.loadtxt(
+                csvfile, delimiter=delimiter, quotechar='"', ndmin=1,
+                usecols=[title.index(name) for name in schema],
+                dtype=[(name, np.dtype(schema[name])) for name in schema]
+            )
+    return {name: np.ascontiguousarray(table[name]) for name in schema}
+
+def write_csv_stream(filepath, title, rows, ignore_title=False,
+                     delimiter=',', compress=None):
+    """Write rows from any iterable, e.g. a generator, without keeping
+    them all in memory.
+
+    Returns:
+        int, number of rows written, not counting the title
+    """
+    rows = iter(rows)
+    row_num = 0
+    with _open_csv(filepath, 'w', compress) as csvfile:
+        csv_writer = csv.writer(csvfile, delimiter=delimiter)
+        if not ignore_title:
+            csv_writer.writerow(title)
+        while True:
+            chunk = list(islice(rows, CHUNK_ROWS))
+            if len(chunk) == 0:
+                break
+            csv_writer.writerows(chunk)
+            row_num += len(chunk)
+    return row_num
+
+def _get_exact_format(column: np.ndarray) -> str:
+    if np.issubdtype(column.dtype, np.integer):
+        return '%d'
+    if np.issubdtype(column.dtype, np.floating):
+        return '%r'
+    return '%s'
+
+def write_csv_arrays(filepath, title, columns: list, fmt=None,
+                     ignore_title=False, delimiter=',', compress=None):
+    """Write equal length numpy arrays as the columns of a csv file.
+
+    Rows are formatted and written CHUNK_ROWS at a time, without the csv
+    module or a list of rows.
+
+    Parameters:
+        columns: list of 1-D array-like, one per column
+        fmt: format of all columns, or a list with one format per column,
+             e.g. ['%.1f', '%.3f'], None for exact values: '%d' for
+             integer columns, '%r' for float columns, which reads back
+             the same float, '%s' for others
+    Returns:
+        int, number of rows written, not counting the title
+    """
+    columns = [np.asarray(column) for column in columns]
+    if len(set(len(column) for column in columns)) > 1:
+        raise ValueError('columns must have the same length!')
+    row_num = len(columns[0]) if columns else 0
+    if fmt is None:
+        fmt = [_get_exact_format(column) for column in columns]
+    elif isinstance(fmt, str):
+        fmt = [fmt] * len(columns)
+    row_fmt = delimiter.join(fmt) + '\n'
+    with _open_csv(filepath, 'w', compress) as csvfile:
+        if not ignore_title:
+            csv.writer(csvfile, delimiter=delimiter).writerow(title)
+        for begin in range(0, row_num, CHUNK_ROWS):
+            block = [column[begin:begin + CHUNK_ROWS] for column in columns]
+            csvfile.write(''.join(
+                row_fmt % row for row in zip(*[b.tolist() for b in block])
+            ))
+    return row_num
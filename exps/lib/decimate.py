@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+#
+# Downsample long (x, y) series before plotting.
+
+import numpy as np
+
+def _as_sorted_arrays(x, y):
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if len(x) != len(y):
+        raise ValueError('x and y must have the same length!')
+    if len(x) > 1 and np.any(np.diff(x) < 0):
+        order = np.argsort(x, kind='stable')
+        x = x[order]
+        y = y[order]
+    return x, y
+
+def _first_index_of(mask, bins):
+    # index of the first True of mask in each bin, bins is sorted
+    index = np.flatnonzero(mask)
+    _, first = np.unique(bins[index], return_index=True)
+    return index[first]
+
+def minmax_decimate(x, y, columns: int):
+    """Keep the first, last, min and max point of each of columns equal
+    width x bins, i.e. each pixel column of the plot.
+
+    A line through the kept points draws the same pixels as the full
+    series, so spikes are never lost.
+
+    Parameters:
+        x, y: sequence of float, x does not have to be sorted
+        columns: int, number of bins, e.g. the width of the plot in pixels
+    Returns:
+        (x, y), np.ndarray of at most 4 * columns points sorted by x
+    """
+    x, y = _as_sorted_arrays(x, y)
+    if columns <= 0:
+        raise ValueError('parameter columns error!')
+    if len(x) <= 4 * columns:
+        return x, y
+    width = (x[-1] - x[0]) / columns
+    if width <= 0:
+        return x[[0, -1]], y[[0, -1]]
+    bins = np.minimum(((x - x[0]) / width).astype(np.int64), columns - 1)
+    # x is sorted, so points of one bin are contiguous
+    firsts = np.flatnonzero(np.diff(bins, prepend=-1))
+    lasts = np.append(firsts[1:] - 1, len(x) - 1)
+    # reduceat gives one value per non-empty bin, empty bins (gaps in x)
+    # have none, so points look up their bin by its rank
+    rank = np.cumsum(np.diff(bins, prepend=-1) != 0) - 1
+    mins = _first_index_of(y == np.minimum.reduceat(y, firsts)[rank], bins)
+    maxs = _first_index_of(y == np.maximum.reduceat(y, firsts)[rank], bins)
+    keep = np.unique(np.concatenate((firsts, lasts, mins, maxs)))
+    return x[keep], y[keep]
+
+def lttb_decimate(x, y, threshold: int):
+    """Largest-Triangle-Three-Buckets downsampling to threshold points.
+
+    Keeps the first and last point, and from each bucket in between the
+    point forming the largest triangle with the point kept from the
+    previous bucket and the mean of the next bucket.
+
+    Parameters:
+        x, y: sequence of float, x does not have to be sorted
+        threshold: int, number of points to keep, at least 3
+    Returns:
+        (x, y), np.ndarray of at most threshold points sorted by x
+    """
+    x, y = _as_sorted_arrays(x, y)
+    if threshold < 3:
+        raise ValueError('parameter threshold error!')
+    n = len(x)
+    if n <= threshold:
+        return x, y
+    # bucket k covers [bounds[k], bounds[k+1]) of the points in between
+    bounds = (np.arange(threshold - 1) * (n - 2) / (threshold - 2)).astype(
+        np.int64) + 1
+    bounds[-1] = n - 1
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0] = 0
+    keep[-1] = n - 1
+    prev = 0
+    for k in range(threshold - 2):
+        begin, end = bounds[k], bounds[k + 1]
+        if k + 2 < len(bounds):
+            next_begin, next_end = bounds[k + 1], bounds[k + 2]
+        else:
+            next_begin, next_end = n - 1, n
+        next_x = x[next_begin:next_end].mean()
+        next_y = y[next_begin:next_end].mean()
+        areas = np.abs((x[prev] - next_x) * (y[begin:end] - y[prev]) -
+                       (x[prev] - x[begin:end]) * (next_y - y[prev]))
+        prev = begin + int(np.argmax(areas))
+        keep[k + 1] = prev
+    return x[keep], y[keep]
+
+def _lttb_columns(x, y, columns):
+    # LTTB keeps one point per bucket, two buckets per column give it a
+    # point budget of the same order as min/max
+    return lttb_decimate(x, y, max(2 * columns, 3))
+
+DECIMATE_METHODS = {
+    'minmax': minmax_decimate,
+    'lttb': _lttb_columns,
+}
+
+def decimate(x, y, columns: int, method='minmax'):
+    """
+    method: 'minmax'|'lttb'
+    """
+    if method not in DECIMATE_METHODS:
+        raise ValueError('parameter method error!')
+    return DECIMATE_METHODS[method](x, y, columns)
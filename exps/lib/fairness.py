@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+#
+# Vectorized fairness metrics over flows x time rate matrices.
+
+import numpy as np
+
+from lib.rate_matrix import build_aligned_rate_matrix
+
+def build_rate_matrix(iperf_datas: list, offsets: list, interval: float,
+                      unit='Mbps'):
+    """Stack per-flow rate series into one flows x time matrix with one
+    slot per interval seconds, see rate_matrix.build_aligned_rate_matrix().
+
+    Parameters:
+        iperf_datas: list of IperfData (or IperfColumnData), one per flow
+        offsets: list of float, start time of each flow, unit:sec
+        interval: float, slot width, unit:sec, e.g. the iperf interval 0.5
+        unit: 'bps'|'Kbps'|'Mbps'|'Gbps'
+    Returns:
+        np.ndarray[float64] of shape (flows, time slots), NaN where a
+        flow is not active
+    """
+    return build_aligned_rate_matrix(iperf_datas, offsets, interval,
+                                     unit=unit)[1]
+
+def jain_index(rates, axis=0):
+    """Jain's fairness index (sum x)^2 / (n * sum x^2) along axis,
+    ignoring NaN entries.
+    """
+    rates = np.asarray(rates, dtype=np.float64)
+    n = np.sum(~np.isnan(rates), axis=axis)
+    val_sum = np.nansum(rates, axis=axis)
+    square_sum = np.nansum(rates * rates, axis=axis)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return val_sum ** 2 / (n * square_sum)
+
+def sliding_fairness(rate_matrix, window: int, step=1):
+    """Fairness metrics of window-averaged rates over sliding windows.
+
+    A flow takes part in a window only if it is active (not NaN) in
+    every slot of the window.
+
+    Parameters:
+        rate_matrix: np.ndarray, flows x time slots, see build_rate_matrix()
+        window: int, window width in time slots
+        step: int, distance between window begins in time slots
+    Returns:
+        dict of np.ndarray, one value per window:
+            'begin': first time slot of the window
+            'flows': number of flows taking part
+            'jain': Jain's fairness index
+            'min_max_ratio': min rate / max rate
+            'norm_dev': standard deviation / mean of rates
+    """
+    rate_matrix = np.asarray(rate_matrix, dtype=np.float64)
+    flows, slots = rate_matrix.shape
+    begins = np.arange(0, max(slots - window + 1, 0), step)
+
+    # window sums from prefix sums, one pass over the matrix
+    valid = ~np.isnan(rate_matrix)
+    zero_filled = np.where(valid, rate_matrix, 0.0)
+    prefix_sum = np.zeros((flows, slots + 1))
+    np.cumsum(zero_filled, axis=1, out=prefix_sum[:, 1:])
+    prefix_valid = np.zeros((flows, slots + 1), dtype=np.int64)
+    np.cumsum(valid, axis=1, out=prefix_valid[:, 1:])
+
+    window_sum = prefix_sum[:, begins + window] - prefix_sum[:, begins]
+    window_valid = prefix_valid[:, begins + window] - prefix_valid[:, begins]
+    active = window_valid == window
+    # flows x windows, NaN for flows not active in the whole window
+    window_rates = np.where(active, window_sum / window, np.nan)
+
+    n = active.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.nansum(window_rates, axis=0) / n
+        norm_dev = np.sqrt(
+            np.nansum((window_rates - mean) ** 2, axis=0) / n
+        ) / mean
+        min_max_ratio = np.where(
+            n > 0,
+            np.min(np.where(active, window_rates, np.inf), axis=0,
+                   initial=np.inf) /
+            np.max(np.where(active, window_rates, -np.inf), axis=0,
+                   initial=-np.inf),
+            np.nan
+        )
+    return {
+        'begin': begins,
+        'flows': n,
+        'jain': jain_index(window_rates, axis=0),
+        'min_max_ratio': min_max_ratio,
+        'norm_dev': norm_dev,
+    }
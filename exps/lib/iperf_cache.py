@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+#
+# On-disk .npz cache of parsed iperf data files.
+
+import os
+import zipfile
+
+import numpy as np
+
+from lib.iperf_data import IperfData
+from lib.iperf_column_data import IperfColumnData
+
+# Cache files live in <data_dir>/.iperf_cache/<file_name>.npz
+CACHE_DIR_NAME = '.iperf_cache'
+CACHE_VERSION = 2
+
+def get_cache_path(filepath: str) -> str:
+    data_dir, file_name = os.path.split(os.path.abspath(filepath))
+    return os.path.join(data_dir, CACHE_DIR_NAME, file_name + '.npz')
+
+def get_source_key(filepath: str):
+    """Return the (path, size, mtime) a cache of filepath is valid for."""
+    stat = os.stat(filepath)
+    return (os.path.abspath(filepath), stat.st_size, stat.st_mtime_ns)
+
+def read_cache(filepath: str):
+    """Return the cached IperfColumnData of filepath, or None if there is
+    no cache or the source file changed since it was written.
+    """
+    cache_path = get_cache_path(filepath)
+    if not os.path.exists(cache_path):
+        return None
+    source_path, source_size, source_mtime = get_source_key(filepath)
+    try:
+        with np.load(cache_path, allow_pickle=False) as npz:
+            if int(npz['version']) != CACHE_VERSION or \
+               str(npz['source_path']) != source_path or \
+               int(npz['source_size']) != source_size or \
+               int(npz['source_mtime']) != source_mtime:
+                return None
+            return IperfColumnData(npz['start_times'], npz['end_times'],
+                                   npz['transfer_bytes'], npz['bandwidths'])
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+        # unreadable cache is just a cache miss
+        return None
+
+def write_cache(filepath: str, iperf_data, source_key: tuple):
+    """Save iperf_data, IperfData or IperfColumnData, as the cache of
+    filepath.
+
+    source_key is get_source_key(filepath) taken before filepath was
+    parsed, so that a file still being written is never cached under the
+    key of its later, longer content.
+    """
+    cache_path = get_cache_path(filepath)
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    source_path, source_size, source_mtime = source_key
+    if isinstance(iperf_data, IperfData):
+        iperf_data = IperfColumnData.from_iperf_data(iperf_data)
+    # write to a private file first, so that concurrent readers
+    # never see a partially written cache
+    tmp_path = '%s.%d.tmp' % (cache_path, os.getpid())
+    try:
+        with open(tmp_path, 'wb') as f:
+            np.savez(f,
+                     version=CACHE_VERSION,
+                     source_path=source_path,
+                     source_size=source_size,
+                     source_mtime=source_mtime,
+                     start_times=iperf_data.start_times,
+                     end_times=iperf_data.end_times,
+                     transfer_bytes=iperf_data.transfer_bytes,
+                     bandwidths=iperf_data.bandwidths)
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+#
+# Define IperfColumnData class, a columnar NumPy-backed variant of IperfData.
+
+from array import array
+
+import numpy as np
+
+from lib.iperf_data import IperfData, IperfEntry
+
+# Multiply a Mbps value by these factors to get the target unit.
+BANDWIDTH_UNIT_FACTORS = {
+    'bps': 1000.0 * 1000.0,
+    'Kbps': 1000.0,
+    'Mbps': 1.0,
+    'Gbps': 1.0 / 1000.0,
+}
+
+class IperfColumnData:
+    """Iperf data stored as contiguous columns instead of IperfEntry objects.
+
+       Has the same accessors as IperfData, but they return numpy arrays
+       instead of lists, so they must not be concatenated with `+`.
+
+       Attributes:
+           start_times : np.ndarray[float64]     // interval begin time, sec
+           end_times : np.ndarray[float64]       // interval end time, sec
+           transfer_bytes : np.ndarray[int64]    // unit: byte
+           bandwidths : np.ndarray[float64]      // unit: Mbps
+    """
+
+    def __init__(self, start_times=None, end_times=None,
+                 transfer_bytes=None, bandwidths=None):
+        if start_times is None:
+            start_times = np.empty(0, dtype=np.float64)
+            end_times = np.empty(0, dtype=np.float64)
+            transfer_bytes = np.empty(0, dtype=np.int64)
+            bandwidths = np.empty(0, dtype=np.float64)
+        self.start_times = np.asarray(start_times, dtype=np.float64)
+        self.end_times = np.asarray(end_times, dtype=np.float64)
+        self.transfer_bytes = np.asarray(transfer_bytes, dtype=np.int64)
+        self.bandwidths = np.asarray(bandwidths, dtype=np.float64)
+
+    @classmethod
+    def from_entries(cls, entries):
+        """Build an IperfColumnData from any iterable of IperfEntry,
+        e.g. IperfParser.iter_entries().
+        """
+        start_times = array('d')
+        end_times = array('d')
+        transfer_bytes = array('q')
+        bandwidths = array('d')
+        for entry in entries:
+            start_times.append(entry.start_time_num)
+            end_times.append(entry.end_time_num)
+            transfer_bytes.append(entry.transfer_bytes)
+            bandwidths.append(entry.bandwidth)
+        return cls(np.frombuffer(start_times, dtype=np.float64),
+                   np.frombuffer(end_times, dtype=np.float64),
+                   np.frombuffer(transfer_bytes, dtype=np.int64),
+                   np.frombuffer(bandwidths, dtype=np.float64))
+
+    @classmethod
+    def from_iperf_data(cls, iperf_data: IperfData):
+        return cls.from_entries(
+            iperf_data.get_entry(i) for i in range(iperf_data.size())
+        )
+
+    def to_iperf_data(self) -> IperfData:
+        """Build an IperfData, one IperfEntry per row. Time strings are
+        rebuilt from the float columns, see get_end_time_strs().
+        """
+        return IperfData.from_entries(
+            IperfEntry(str(stime), str(etime), nbytes, bandwidth)
+            for stime, etime, nbytes, bandwidth
+            in zip(self.start_times.tolist(), self.end_times.tolist(),
+                   self.transfer_bytes.tolist(), self.bandwidths.tolist())
+        )
+
+    def _get_factor(self, unit: str) -> float:
+        if unit not in BANDWIDTH_UNIT_FACTORS:
+            raise ValueError('parameter unit error!')
+        return BANDWIDTH_UNIT_FACTORS[unit]
+
+    def size(self):
+        return len(self.end_times)
+
+    def slice(self, begin=0, end=None):
+        """Return an IperfColumnData viewing rows [begin, end), no copy."""
+        return IperfColumnData(self.start_times[begin:end],
+                               self.end_times[begin:end],
+                               self.transfer_bytes[begin:end],
+                               self.bandwidths[begin:end])
+
+    def get_end_time_strs(self, begin=0, end=None):
+        # Rebuilt from the float column, e.g. "0.50" comes back as "0.5".
+        return [str(t) for t in self.end_times[begin:end].tolist()]
+
+    def get_start_time_nums(self, begin=0, end=None, offset=0):
+        if offset == 0:
+            # a copy, callers may change the result in place
+            return self.start_times[begin:end].copy()
+        return self.start_times[begin:end] + offset
+
+    def get_end_time_nums(self, begin=0, end=None, offset=0):
+        if offset == 0:
+            # a copy, callers may change the result in place
+            return self.end_times[begin:end].copy()
+        return self.end_times[begin:end] + offset
+
+    def get_bandwidth_list(self, unit: str, begin=0, end=None):
+        """
+        unit: 'bps'|'Kbps'|'Mbps'|'Gbps'
+        """
+        factor = self._get_factor(unit)
+        if factor == 1.0:
+            # a copy, callers may change the result in place
+            return self.bandwidths[begin:end].copy()
+        return self.bandwidths[begin:end] * factor
+
+    def get_avg_bandwidth(self, unit: str, begin=0, end=None):
+        """
+        unit: 'bps'|'Kbps'|'Mbps'|'Gbps'
+        """
+        factor = self._get_factor(unit)
+        bandwidths = self.bandwidths[begin:end]
+        if len(bandwidths) == 0:
+            raise ZeroDivisionError('no entry in [begin, end)')
+        return float(bandwidths.mean()) * factor
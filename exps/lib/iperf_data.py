@@ -26,6 +26,16 @@ class IperfData:
     def __init__(self):
         self.__entries = []
 
+    @classmethod
+    def from_entries(cls, entries):
+        """Build an IperfData from any iterable of IperfEntry, 
+        e.g. IperfParser.iter_entries().
+        """
+        iperf_data = cls()
+        for entry in entries:
+            iperf_data.add_entry(entry)
+        return iperf_data
+
     def _get_bandwidth(self, bandwidth: float, unit: str) -> float:
         res = float(bandwidth)
         if unit == 'bps':
@@ -46,6 +56,9 @@ class IperfData:
     def size(self):
         return len(self.__entries)
 
+    def get_entry(self, index: int) -> IperfEntry:
+        return self.__entries[index]
+
     def get_end_time_strs(self, begin=0, end=None):
         # TODO offset
         if end is None:
@@ -55,6 +68,14 @@ class IperfData:
             res.append(entry.end_time_str)
         return res
 
+    def get_start_time_nums(self, begin=0, end=None, offset=0):
+        if end is None:
+            end = self.size()
+        res = []
+        for entry in self.__entries[begin:end]:
+            res.append(entry.start_time_num + offset)
+        return res
+
     def get_end_time_nums(self, begin=0, end=None, offset=0):
         if end is None:
             end = self.size()
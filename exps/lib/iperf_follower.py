@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+#
+# Follow iperf data files while an experiment is still running.
+
+import sys, os
+import argparse
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from lib.iperf_data import IperfData
+from lib.iperf_loader import find_iperf_files
+from lib.iperf_parser import IperfParser
+
+class IperfFollower:
+    """Incrementally parse one iperf data file that is still being written.
+
+       Attributes:
+           filepath : string        // iperf data file
+           offset : int             // bytes of filepath consumed so far
+           iperf_data : IperfData   // entries parsed so far, grows in place
+    """
+
+    def __init__(self, filepath: str, parser=None, encoding='utf-8'):
+        self.filepath = filepath
+        self.parser = parser if parser is not None else IperfParser()
+        self.encoding = encoding
+        self.reset()
+
+    def reset(self):
+        self.offset = 0
+        self.head_found = False
+        self.partial_line = b''
+        self.iperf_data = IperfData()
+
+    def poll(self) -> int:
+        """Parse lines appended since the last poll.
+
+        Only complete lines are parsed, a trailing partial line is kept
+        until its newline shows up. Lines that are not interval reports,
+        e.g. "Sent 4253 datagrams", are skipped.
+
+        Returns:
+            int, number of new entries
+        """
+        try:
+            size = os.path.getsize(self.filepath)
+        except FileNotFoundError:
+            return 0
+        if size < self.offset:
+            # file was truncated or rewritten, e.g. by a new run
+            self.reset()
+        if size == self.offset:
+            return 0
+
+        with open(self.filepath, 'rb') as f:
+            f.seek(self.offset)
+            chunk = f.read(size - self.offset)
+        self.offset = self.offset + len(chunk)
+
+        lines = (self.partial_line + chunk).split(b'\n')
+        self.partial_line = lines.pop()
+
+        new_entries = 0
+        for line in lines:
+            if not self.head_found:
+                if self.parser.head_bytes_re.search(line) is not None:
+                    self.head_found = True
+                continue
+            entry = self.parser.parse_report_bytes(line, self.encoding)
+            if entry is None:
+                continue
+            self.iperf_data.add_entry(entry)
+            new_entries = new_entries + 1
+        return new_entries
+
+class IperfDirFollower:
+    """Follow every iperf data file of an experiment data directory,
+       picking up new files as flows start.
+
+       Attributes:
+           followers : dict      // (project, side, flow_id) -> IperfFollower
+    """
+
+    def __init__(self, data_dir: str, project_names=None, measure_sides=None):
+        self.data_dir = data_dir
+        self.project_names = project_names
+        self.measure_sides = measure_sides
+        self.parser = IperfParser()
+        self.followers = {}
+
+    def poll(self):
+        """Poll all data files.
+
+        Returns:
+            dict, (project, side, flow_id) -> number of new entries,
+            only for files that got new entries
+        """
+        files = find_iperf_files(self.data_dir, self.project_names,
+                                 self.measure_sides)
+        for key, filepath in files.items():
+            if key not in self.followers:
+                self.followers[key] = IperfFollower(filepath, self.parser)
+        updated = {}
+        for key, follower in self.followers.items():
+            new_entries = follower.poll()
+            if new_entries > 0:
+                updated[key] = new_entries
+        return updated
+
+    def get_iperf_datas(self):
+        """
+        Returns:
+            dict, (project, side, flow_id) -> IperfData
+        """
+        return {key: follower.iperf_data
+                for key, follower in self.followers.items()}
+
+def get_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-d', '--data_dir', help='Experiment data dir',
+                        type=str, required=True)
+    parser.add_argument('-s', '--side', help='Measure side',
+                        type=str, required=False, default='server')
+    parser.add_argument('-i', '--interval', help='Poll interval(unit:s)',
+                        type=float, required=False, default=1.0)
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = get_args()
+    dir_follower = IperfDirFollower(args.data_dir, measure_sides=[args.side])
+    while True:
+        updated = dir_follower.poll()
+        iperf_datas = dir_follower.get_iperf_datas()
+        for key in sorted(updated):
+            iperf_data = iperf_datas[key]
+            end_time = iperf_data.get_end_time_nums(begin=-1)[0]
+            bandwidth = iperf_data.get_bandwidth_list('Mbps', begin=-1)[0]
+            print('%s_%s_%d: %.1fs %.3f Mbps' % (key + (end_time, bandwidth)))
+        time.sleep(args.interval)
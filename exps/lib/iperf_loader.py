@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+#
+# Load all iperf data files of an experiment data directory in parallel.
+
+from multiprocessing import Pool
+import os
+import re
+
+from lib.iperf_parser import IperfParser
+
+# Data files are named <project>_<side>_<id>, e.g. A2FQ_server_1.
+FILE_NAME_RE = re.compile(r'^(?P<project>.+)_(?P<side>server|client)_(?P<id>\d+)$')
+
+def find_iperf_files(data_dir: str, project_names=None, measure_sides=None):
+    """Scan data_dir once for iperf data files.
+
+    Returns:
+        dict, (project, side, flow_id) -> file path
+    """
+    files = {}
+    with os.scandir(data_dir) as it:
+        for dir_entry in it:
+            m = FILE_NAME_RE.match(dir_entry.name)
+            if m is None or not dir_entry.is_file():
+                continue
+            project, side = m.group('project'), m.group('side')
+            if project_names is not None and project not in project_names:
+                continue
+            if measure_sides is not None and side not in measure_sides:
+                continue
+            files[(project, side, int(m.group('id')))] = dir_entry.path
+    return files
+
+def _parse_file(filepath: str, use_cache: bool, columns: bool):
+    return IperfParser().iperf_parse(filepath, use_cache=use_cache,
+                                     columns=columns)
+
+def load_iperf_dir(data_dir: str, project_names=None, measure_sides=None,
+                   processes=None, use_cache=False, columns=False):
+    """Parse every iperf data file in data_dir on a process pool.
+
+    Parameters:
+        data_dir: string, experiment data directory
+        project_names: list, e.g. ['AFQ', 'A2FQ'], None for all projects
+        measure_sides: list, e.g. ['server'], None for both sides
+        processes: int, pool size, None for os.cpu_count()
+        use_cache: bool, see IperfParser.iperf_parse()
+        columns: bool, load IperfColumnData instead of IperfData
+    Returns:
+        dict, (project, side, flow_id) -> IperfData or IperfColumnData
+    """
+    files = find_iperf_files(data_dir, project_names, measure_sides)
+    keys = sorted(files)
+    args = [(files[key], use_cache, columns) for key in keys]
+    if processes == 1 or len(args) <= 1:
+        return {key: _parse_file(*arg) for key, arg in zip(keys, args)}
+    with Pool(processes=processes) as pool:
+        iperf_datas = pool.starmap(_parse_file, args)
+    return dict(zip(keys, iperf_datas))
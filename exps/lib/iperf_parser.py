@@ -4,58 +4,239 @@
 # Author: Guangyu Peng (gypeng2021@163.com)
 
 from lib.iperf_data import *
+from lib.iperf_column_data import IperfColumnData
+from lib import iperf_cache
+import mmap
+import os
 import re
+import warnings
+
+# Multiply a number by these factors to get Bytes, keyed by unit prefix.
+TRANSFER_BYTES_FACTORS = {
+    '': 1,
+    'K': 1024,
+    'M': 1024 * 1024,
+    'G': 1024 * 1024 * 1024,
+}
+# Convert a number to Mbps, keyed by unit prefix. Same arithmetic as
+# IperfParser._parse_bandwidth(), e.g. bits/sec is divided by 1000 twice,
+# so that every path gives bit-identical results.
+BANDWIDTH_MBPS_CONVERTERS = {
+    '': lambda number: number / 1000 / 1000,
+    'K': lambda number: number / 1000,
+    'M': lambda number: number,
+    'G': lambda number: number * 1000,
+}
+
+# Bytes scanned per regex pass by IperfParser.iter_entries_mmap().
+MMAP_CHUNK_SIZE = 4 * 1024 * 1024
 
 class IperfParser:
 
-    def __init__(self):
+    def __init__(self, fast_path=True):
+        """
+        Parameters:
+            fast_path: bool, parse interval lines with one anchored regex,
+                       falling back to the per-field regexes only on lines
+                       it does not match.
+        """
+        self.fast_path = fast_path
         self.head_re = re.compile(r'.*Interval\s+Transfer\s+Bandwidth.*')
         self.interval_re = re.compile(r'\d+\.\d+\s*-\s*\d+\.\d+\s*sec')
         self.transfer_re = re.compile(r'\d+\.?\d*\s*[GMK]?Bytes')
         self.bandwidth_re = re.compile(r'\d+\.?\d*\s*[GMK]?bits/sec')
         self.number_re = re.compile(r'\d+\.?\d*')
         self.alpha_re = re.compile(r'[a-zA-Z]+')
+        self.line_re = re.compile(
+            r'\[\s*\w+\]\s*'
+            r'(?P<start>\d+\.\d+)\s*-\s*(?P<end>\d+\.\d+)\s*sec\s+'
+            r'(?P<transfer>\d+\.?\d*)\s*(?P<transfer_unit>[GMK]?)Bytes\s+'
+            r'(?P<bandwidth>\d+\.?\d*)\s*(?P<bandwidth_unit>[GMK]?)bits/sec'
+        )
+        # same patterns on raw bytes, used by iter_entries_mmap()
+        self.head_bytes_re = re.compile(
+            rb'Interval[^\S\n]+Transfer[^\S\n]+Bandwidth'
+        )
+        self.line_bytes_re = re.compile(self.line_re.pattern.encode('ascii'))
+        # one match per line, the last group holds lines line_re rejects
+        self.chunk_bytes_re = re.compile(
+            rb'^(?:' + self.line_bytes_re.pattern + rb'[^\n]*|([^\n]*))\n',
+            re.MULTILINE
+        )
+        self.transfer_bytes_factors = {
+            unit.encode('ascii'): factor
+            for unit, factor in TRANSFER_BYTES_FACTORS.items()
+        }
+        self.bandwidth_mbps_converters = {
+            unit.encode('ascii'): converter
+            for unit, converter in BANDWIDTH_MBPS_CONVERTERS.items()
+        }
 
-    def iperf_parse(self, filepath: str, encoding='utf-8') -> IperfData:
-        iperf_data = IperfData()
-        start_time_list = []
-        end_time_list = []
-        transfer_bytes_list = []
-        bandwidth_Mbps_list = []
+    def iter_entries(self, filepath: str, encoding='utf-8'):
+        """Yield IperfEntry objects one by one while reading filepath.
 
+        Lines are consumed lazily, so only the current entry is kept in
+        memory no matter how long the trace is. Lines that are not interval
+        reports, e.g. "... datagrams received out-of-order", are skipped.
+        """
         with open(filepath, 'r', encoding=encoding) as f:
-            line = f.readline()
-            while line:
-                head_match = self.head_re.match(line)
-                line = f.readline()
-                if head_match is not None:
+            for line in f:
+                if self.head_re.match(line) is not None:
                     break
-        
-            while line:
-                interval = self.interval_re.search(line).group(0)
-                transfer = self.transfer_re.search(line).group(0)
-                bandwidth = self.bandwidth_re.search(line).group(0)
-                #print(interval, transfer, bandwidth)
-                start_time, end_time = self._parse_interval(interval)
-                transfer_bytes = self._parse_transfer(transfer)
-                bandwidth_Mbps = self._parse_bandwidth(bandwidth)
-                start_time_list.append(start_time)
-                end_time_list.append(end_time)
-                transfer_bytes_list.append(transfer_bytes)
-                bandwidth_Mbps_list.append(bandwidth_Mbps)
-                line = f.readline()
-        
-        for stime, etime, transfer_bytes, bandwidth_Mbps in zip(
-                                                start_time_list, 
-                                                end_time_list, 
-                                                transfer_bytes_list, 
-                                                bandwidth_Mbps_list
-                                                ):
-            iperf_entry = IperfEntry(stime, etime, 
-                                     transfer_bytes, bandwidth_Mbps)
-            iperf_data.add_entry(iperf_entry)
+
+            line_match = self.line_re.match
+            for line in f:
+                m = line_match(line) if self.fast_path else None
+                if m is None:
+                    if self.is_report_line(line):
+                        yield self._parse_line(line)
+                    continue
+                start_time, end_time, transfer, transfer_unit, \
+                    bandwidth, bandwidth_unit = m.groups()
+                transfer_bytes = int(
+                    float(transfer) * TRANSFER_BYTES_FACTORS[transfer_unit]
+                )
+                bandwidth_Mbps = \
+                    BANDWIDTH_MBPS_CONVERTERS[bandwidth_unit](float(bandwidth))
+                yield IperfEntry(start_time, end_time,
+                                 transfer_bytes, bandwidth_Mbps)
+
+    def iter_entries_mmap(self, filepath: str, encoding='utf-8',
+                          chunk_size=MMAP_CHUNK_SIZE):
+        """Same as iter_entries(), but memory-maps filepath and matches
+        whole chunks of lines directly on the raw bytes. Only the numeric
+        fields are copied out of the map, no str is built per line.
+        """
+        if not self.fast_path:
+            yield from self.iter_entries(filepath, encoding)
+            return
+        with open(filepath, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                head_match = self.head_bytes_re.search(buf)
+                if head_match is None:
+                    return
+                pos = buf.find(b'\n', head_match.end()) + 1
+                if pos == 0:
+                    return
+
+                size = len(buf)
+                transfer_factors = self.transfer_bytes_factors
+                bandwidth_converters = self.bandwidth_mbps_converters
+                while pos < size:
+                    # [pos, end) always holds whole lines
+                    end = buf.rfind(b'\n', pos, pos + chunk_size) + 1
+                    if end == 0:
+                        end = buf.find(b'\n', pos) + 1
+                        if end == 0:
+                            break
+                    for start_time, end_time, transfer, transfer_unit, \
+                            bandwidth, bandwidth_unit, other_line \
+                            in self.chunk_bytes_re.findall(buf, pos, end):
+                        if not start_time:
+                            other_line = other_line.decode(encoding)
+                            if self.is_report_line(other_line):
+                                yield self._parse_line(other_line)
+                            continue
+                        transfer_bytes = int(
+                            float(transfer) * transfer_factors[transfer_unit]
+                        )
+                        bandwidth_Mbps = bandwidth_converters[
+                            bandwidth_unit](float(bandwidth))
+                        yield IperfEntry(start_time.decode('ascii'),
+                                         end_time.decode('ascii'),
+                                         transfer_bytes, bandwidth_Mbps)
+                    pos = end
+
+                # last line without a trailing newline
+                if pos < size:
+                    entry = self.parse_report_bytes(buf[pos:size], encoding)
+                    if entry is not None:
+                        yield entry
+
+    def parse_line_bytes(self, line: bytes, encoding='utf-8') -> IperfEntry:
+        """Parse one raw iperf data line into an IperfEntry."""
+        m = self.line_bytes_re.match(line)
+        if m is None:
+            return self._parse_line(line.decode(encoding))
+        return self._entry_from_bytes_match(m)
+
+    def parse_report_bytes(self, line: bytes, encoding='utf-8'):
+        """Same as parse_line_bytes(), but returns None for a line that is
+        not an interval report, e.g. "Sent 4253 datagrams".
+        """
+        m = self.line_bytes_re.match(line)
+        if m is not None:
+            return self._entry_from_bytes_match(m)
+        text = line.decode(encoding)
+        if not self.is_report_line(text):
+            return None
+        return self._parse_line(text)
+
+    def is_report_line(self, line: str) -> bool:
+        """If _parse_line() can parse line."""
+        return self.interval_re.search(line) is not None and \
+               self.transfer_re.search(line) is not None and \
+               self.bandwidth_re.search(line) is not None
+
+    def _entry_from_bytes_match(self, m) -> IperfEntry:
+        start_time, end_time, transfer, transfer_unit, \
+            bandwidth, bandwidth_unit = m.groups()
+        return IperfEntry(
+            start_time.decode('ascii'), end_time.decode('ascii'),
+            int(float(transfer) * self.transfer_bytes_factors[transfer_unit]),
+            self.bandwidth_mbps_converters[bandwidth_unit](float(bandwidth))
+        )
+
+    def iperf_parse(self, filepath: str, encoding='utf-8',
+                    use_cache=False, use_mmap=False, columns=False):
+        """
+        Parameters:
+            use_cache: bool, load the result from the .npz cache next to
+                       filepath if it is still valid, otherwise parse and
+                       save it, see lib.iperf_cache.
+            use_mmap: bool, read filepath with iter_entries_mmap(),
+                      faster on multi-GB logs.
+            columns: bool, return an IperfColumnData instead of IperfData,
+                     a cache hit is then returned without building any
+                     IperfEntry.
+        Returns:
+            IperfData, or IperfColumnData if columns is True
+        """
+        if use_cache:
+            column_data = iperf_cache.read_cache(filepath)
+            if column_data is not None:
+                if columns:
+                    return column_data
+                return column_data.to_iperf_data()
+            source_key = iperf_cache.get_source_key(filepath)
+        if use_mmap:
+            entries = self.iter_entries_mmap(filepath, encoding)
+        else:
+            entries = self.iter_entries(filepath, encoding)
+        if columns:
+            iperf_data = IperfColumnData.from_entries(entries)
+        else:
+            iperf_data = IperfData.from_entries(entries)
+        if use_cache:
+            # best effort, e.g. the results directory may be read-only
+            try:
+                iperf_cache.write_cache(filepath, iperf_data, source_key)
+            except OSError as e:
+                warnings.warn('iperf cache not written: %s' % e)
         return iperf_data
 
+    def _parse_line(self, line: str) -> IperfEntry:
+        interval = self.interval_re.search(line).group(0)
+        transfer = self.transfer_re.search(line).group(0)
+        bandwidth = self.bandwidth_re.search(line).group(0)
+        start_time, end_time = self._parse_interval(interval)
+        transfer_bytes = self._parse_transfer(transfer)
+        bandwidth_Mbps = self._parse_bandwidth(bandwidth)
+        return IperfEntry(start_time, end_time,
+                          transfer_bytes, bandwidth_Mbps)
+
     def _parse_interval(self, interval: str):
         numbers = self.number_re.findall(interval)
         return (numbers[0], numbers[1])
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+#
+# Micro-benchmark of IperfParser on a synthetic iperf log,
+# comparing the single-regex fast path with the legacy per-field regexes.
+
+import sys, os
+import argparse
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from lib.iperf_parser import IperfParser
+
+HEAD = '[ ID] Interval       Transfer     Bandwidth        ' \
+       'Jitter   Lost/Total Datagrams\n'
+LINE_PATTERN = '[  3] %4.1f-%4.1f sec   %d KBytes  %.2f Mbits/sec   ' \
+               '0.012 ms    0/  213 (0%%)\n'
+
+def write_synthetic_log(filepath: str, lines: int, gap=0.5):
+    with open(filepath, 'w', encoding='utf-8') as f:
+        f.write(HEAD)
+        for i in range(lines):
+            kbytes = 200 + i % 200
+            f.write(LINE_PATTERN % (i * gap, (i + 1) * gap, kbytes,
+                                    kbytes * 1024 * 8 / gap / 1000 / 1000))
+
+def bench(parser: IperfParser, filepath: str, lines: int,
+          use_mmap=False) -> float:
+    """Return parsed lines per second."""
+    if use_mmap:
+        entries = parser.iter_entries_mmap(filepath)
+    else:
+        entries = parser.iter_entries(filepath)
+    begin = time.perf_counter()
+    num = 0
+    for _ in entries:
+        num = num + 1
+    elapsed = time.perf_counter() - begin
+    assert num == lines
+    return num / elapsed
+
+def get_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--lines', help='Lines of the synthetic log',
+                        type=int, required=False, default=1000000)
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = get_args()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filepath = os.path.join(tmp_dir, 'iperf_bench.txt')
+        write_synthetic_log(filepath, args.lines)
+        legacy = bench(IperfParser(fast_path=False), filepath, args.lines)
+        fast = bench(IperfParser(fast_path=True), filepath, args.lines)
+        fast_mmap = bench(IperfParser(fast_path=True), filepath, args.lines,
+                          use_mmap=True)
+    print('legacy: %.0f lines/sec' % legacy)
+    print('fast:   %.0f lines/sec' % fast)
+    print('mmap:   %.0f lines/sec' % fast_mmap)
+    print('speedup: %.2fx, mmap %.2fx' % (fast / legacy, fast_mmap / legacy))
@@ -3,56 +3,150 @@
 # Classes for plotting exp graph.
 # Author: Guangyu Peng (gypeng2021@163.com)
 
-import matplotlib.pyplot as plt
+from multiprocessing import Pool
 
-plt.rc('font', family='Times New Roman')
-plt.rcParams['font.size'] = 12
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from lib.decimate import decimate
+
+matplotlib.rc('font', family='Times New Roman')
+matplotlib.rcParams['font.size'] = 12
+
+DEFAULT_FIGSIZE = tuple(matplotlib.rcParams['figure.figsize'])
+WIDE_FIGSIZE = (10, 5)
+
+class FigurePool:
+    """Reuse Figure/Axes objects across plots instead of creating a new
+       pyplot figure each time.
+
+       Figures are plain matplotlib Figure objects on an Agg canvas, they
+       are never registered in pyplot, so nothing leaks between plots.
+    """
+
+    def __init__(self):
+        self.__free = {}
+
+    def acquire(self, figsize=DEFAULT_FIGSIZE):
+        """Return a cleared (figure, axes) pair of the given size."""
+        figsize = tuple(figsize)
+        free = self.__free.get(figsize)
+        if free:
+            fig, axes = free.pop()
+            axes.cla()
+            return fig, axes
+        fig = Figure(figsize=figsize)
+        FigureCanvasAgg(fig)
+        axes = fig.add_subplot(1, 1, 1)
+        return fig, axes
+
+    def release(self, fig, axes):
+        self.__free.setdefault(tuple(fig.get_size_inches()), []).append(
+            (fig, axes)
+        )
+
+# one pool per process, worker processes of render_parallel() get their own
+figure_pool = FigurePool()
+
+def render_parallel(render_func, args_list: list, processes=None):
+    """Call render_func(*args) for each args in args_list on a process
+    pool, e.g. one experiment data directory per call.
+
+    render_func must be a module-level function. Returns the results in
+    the order of args_list.
+    """
+    if processes == 1 or len(args_list) <= 1:
+        return [render_func(*args) for args in args_list]
+    with Pool(processes=processes) as pool:
+        return pool.starmap(render_func, args_list)
 
 class ConvergencePlotter:
-    def __init__(self, y_min=None, y_max=None, wide=False):
+    """Goodput of each flow over time.
+
+       lod: None to plot every sample, 'minmax'|'lttb' to downsample each
+            flow to the pixel columns of the figure first, see
+            lib.decimate
+       lod_dpi: dpi the figure will be saved with, sets the number of
+                pixel columns
+    """
+
+    def __init__(self, y_min=None, y_max=None, wide=False, pool=None,
+                 lod=None, lod_dpi=600):
         # self.x_list = []
         # self.y_list = []
         # self.flow_ids = []
+        self.pool = pool if pool is not None else figure_pool
         if wide:
-            plt.figure(figsize=(10, 5))
+            self.fig, self.axes = self.pool.acquire(WIDE_FIGSIZE)
         else:
-            plt.figure()
+            self.fig, self.axes = self.pool.acquire()
         self.line_style = ['-', '--', '-.', ':']
+        self.lod = lod
+        self.lod_columns = int(self.fig.get_size_inches()[0] * lod_dpi)
         if y_min is not None and y_max is not None:
-            axes = plt.gca()
-            axes.set_ylim([y_min, y_max])
+            self.axes.set_ylim([y_min, y_max])
 
     def __get_line_style(self, id):
         if id >= len(self.line_style):
             return '--'
         else:
             return self.line_style[id]
-    
+
     def add_flow(self, x, y, flow_id, group_flows=None):
+        if self.lod is not None:
+            # lod_columns bins over the span of this flow alone, so a flow
+            # shorter than the whole plot is kept at a finer resolution
+            # than the pixels it covers, never a coarser one
+            x, y = decimate(x, y, self.lod_columns, self.lod)
         if group_flows is None or group_flows == 1:
-            plt.plot(x, y, marker='.', linestyle=self.__get_line_style(flow_id),
+            self.axes.plot(x, y, marker='.',
+                linestyle=self.__get_line_style(flow_id),
                 ms=1, label='flow-%d' % flow_id)
         else:
             flow_start = flow_id - group_flows + 1
-            plt.plot(x, y, marker='.', linestyle=self.__get_line_style(flow_id),
+            self.axes.plot(x, y, marker='.',
+                linestyle=self.__get_line_style(flow_id),
                 ms=1, label='flow %d-%d' % (flow_start, flow_id))
 
     def save_fig(self, path, dpi=600):
-        plt.xlabel('Time (s)')
-        plt.ylabel('Goodput (Mbps)')
-        plt.legend(loc='upper center')
-        plt.savefig(path, dpi=dpi)
+        """Save the figure and give it back to the pool, the plotter
+        cannot be used after that.
+        """
+        self.axes.set_xlabel('Time (s)')
+        self.axes.set_ylabel('Goodput (Mbps)')
+        self.axes.legend(loc='upper center')
+        self.fig.savefig(path, dpi=dpi)
+        self.close()
+
+    def close(self):
+        if self.fig is not None:
+            self.pool.release(self.fig, self.axes)
+            self.fig = None
+            self.axes = None
 
 class FairnessPlotter:
-    def __init__(self):
-        plt.figure()
+    def __init__(self, pool=None):
+        self.pool = pool if pool is not None else figure_pool
+        self.fig, self.axes = self.pool.acquire()
 
     def plot(self, x, y_list, legend_list, marker_list):
         for y, legend, marker in zip(y_list, legend_list, marker_list):
-            plt.plot(x, y, marker=marker, ms=5, label=legend)
+            self.axes.plot(x, y, marker=marker, ms=5, label=legend)
 
     def save_fig(self, path, dpi=600):
-        plt.xlabel('Number of Flows')
-        plt.ylabel("Jain's fairness index")
-        plt.legend()
-        plt.savefig(path, dpi=dpi)
\ No newline at end of file
+        """Save the figure and give it back to the pool, the plotter
+        cannot be used after that.
+        """
+        self.axes.set_xlabel('Number of Flows')
+        self.axes.set_ylabel("Jain's fairness index")
+        self.axes.legend()
+        self.fig.savefig(path, dpi=dpi)
+        self.close()
+
+    def close(self):
+        if self.fig is not None:
+            self.pool.release(self.fig, self.axes)
+            self.fig = None
+            self.axes = None
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+#
+# Align per-flow iperf rate series on a common time grid.
+
+import numpy as np
+
+# Tolerance when comparing iperf time stamps, unit:sec.
+TIME_EPS = 1e-6
+
+def get_flow_series(iperf_data, offset=0.0, unit='Mbps'):
+    """Return (starts, ends, rates) arrays of one flow, shifted by offset.
+
+    Entries overlapping earlier ones, e.g. the final "0.0-50.0 sec"
+    summary line of iperf, are dropped.
+    """
+    starts = np.asarray(iperf_data.get_start_time_nums(offset=offset),
+                        dtype=np.float64)
+    ends = np.asarray(iperf_data.get_end_time_nums(offset=offset),
+                      dtype=np.float64)
+    rates = np.asarray(iperf_data.get_bandwidth_list(unit), dtype=np.float64)
+    if len(starts) == 0:
+        return starts, ends, rates
+    prev_ends = np.maximum.accumulate(np.concatenate(([-np.inf], ends[:-1])))
+    keep = starts >= prev_ends - TIME_EPS
+    return starts[keep], ends[keep], rates[keep]
+
+def _cumulative(starts, ends, values, edges):
+    # Integral of a per-entry constant value from starts[0] to each edge,
+    # linear inside an entry and flat in gaps between entries.
+    amounts = np.cumsum(values * (ends - starts))
+    points = np.column_stack((starts, ends)).ravel()
+    totals = np.column_stack(
+        (np.concatenate(([0.0], amounts[:-1])), amounts)
+    ).ravel()
+    return np.interp(edges, points, totals)
+
+def _bucket_rates(starts, ends, rates, edges):
+    # Time-weighted average rate in each [edges[k], edges[k+1]). A slot is
+    # covered only if the entries overlapping it add up to its width.
+    widths = np.diff(edges)
+    bucket_rates = np.diff(_cumulative(starts, ends, rates, edges)) / widths
+    covered_time = np.diff(_cumulative(starts, ends, np.ones_like(rates),
+                                       edges))
+    covered = (edges[:-1] >= starts[0] - TIME_EPS) & \
+              (edges[1:] <= ends[-1] + TIME_EPS) & \
+              (covered_time >= widths - TIME_EPS)
+    return np.where(covered, bucket_rates, np.nan)
+
+def _interp_rates(starts, ends, rates, edges):
+    # Rate at each bucket center, linearly interpolated between the
+    # centers of iperf intervals. Centers falling in a gap between entries
+    # are not covered.
+    centers = (edges[:-1] + edges[1:]) / 2
+    sample_centers = (starts + ends) / 2
+    interp_rates = np.interp(centers, sample_centers, rates)
+    index = np.searchsorted(starts, centers + TIME_EPS, side='right') - 1
+    in_entry = (index >= 0) & \
+               (centers <= ends[np.maximum(index, 0)] + TIME_EPS)
+    covered = (centers >= sample_centers[0] - TIME_EPS) & \
+              (centers <= sample_centers[-1] + TIME_EPS) & in_entry
+    return np.where(covered, interp_rates, np.nan)
+
+RESAMPLE_METHODS = {
+    'bucket': _bucket_rates,
+    'interp': _interp_rates,
+}
+
+def build_aligned_rate_matrix(iperf_datas: list, offsets: list, step: float,
+                              t_begin=0.0, t_end=None, unit='Mbps',
+                              method='bucket'):
+    """Resample every flow onto one time grid and stack them.
+
+    Works for any iperf report interval, the grid step does not have to
+    match it.
+
+    Parameters:
+        iperf_datas: list of IperfData (or IperfColumnData), one per flow
+        offsets: list of float, start time of each flow, unit:sec
+        step: float, grid step, unit:sec
+        t_begin: float, begin of the grid, unit:sec
+        t_end: float, end of the grid, unit:sec, None for the end of the
+               last flow
+        unit: 'bps'|'Kbps'|'Mbps'|'Gbps'
+        method: 'bucket' for time-weighted averages over each slot,
+                'interp' for linear interpolation at slot centers
+    Returns:
+        (edges, rate_matrix), edges is np.ndarray of slot boundaries with
+        length slots+1, rate_matrix is np.ndarray of shape (flows, slots),
+        NaN where a flow does not cover the whole slot
+    """
+    if method not in RESAMPLE_METHODS:
+        raise ValueError('parameter method error!')
+    resample = RESAMPLE_METHODS[method]
+    series = [get_flow_series(iperf_data, offset, unit)
+              for iperf_data, offset in zip(iperf_datas, offsets)]
+    if t_end is None:
+        t_end = max([ends[-1] for _, ends, _ in series if len(ends) > 0],
+                    default=t_begin)
+    slots = max(int(np.ceil((t_end - t_begin) / step - TIME_EPS)), 0)
+    edges = t_begin + step * np.arange(slots + 1)
+
+    rate_matrix = np.full((len(series), slots), np.nan)
+    for row, (starts, ends, rates) in enumerate(series):
+        if len(rates) > 0 and slots > 0:
+            rate_matrix[row] = resample(starts, ends, rates, edges)
+    return edges, rate_matrix
@@ -0,0 +1,61 @@
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(
+    os.path.realpath(__file__))), 'utils'))
+
+import pytest
+
+from p4runtime_lib.convert import (encode, encodeMac, decodeMac, encodeIPv4,
+                                   decodeIPv4, encodeNum, decodeNum,
+                                   matchesIPv4, makeEncoder)
+
+def _outcome(f, *args):
+    try:
+        return 'ok', f(*args)
+    except Exception as e:
+        return 'error', type(e)
+
+def test_round_trips():
+    mac = 'aa:bb:cc:dd:ee:ff'
+    assert encodeMac(mac) == b'\xaa\xbb\xcc\xdd\xee\xff'
+    assert decodeMac(encodeMac(mac)) == mac
+    ip = '10.0.0.1'
+    assert encodeIPv4(ip) == b'\x0a\x00\x00\x01'
+    assert decodeIPv4(encodeIPv4(ip)) == ip
+    assert encodeNum(1337, 5 * 8) == b'\x00\x00\x00\x05\x39'
+    assert decodeNum(encodeNum(1337, 5 * 8)) == 1337
+    assert matchesIPv4('10.0.0.1')
+    assert not matchesIPv4('10.0.0.1.5')
+    assert not matchesIPv4('1000.0.0.1')
+    assert not matchesIPv4('10001')
+    with pytest.raises(Exception):
+        encodeNum(256, 8)
+
+@pytest.mark.parametrize('value, bitwidth', [
+    (0, 9), (7, 9), (511, 9), (512, 9), (1337, 40), (1337, 48), (5, 32),
+    (2 ** 48 - 1, 48),
+    ([5], 9), ((3,), 32), (['10.0.0.1'], 32), ([1, 2], 9),
+    ('aa:BB:cc:dd:ee:0f', 48), ('08:00:00:00:01:11', 48),
+    ('zz:bb:cc:dd:ee:ff', 48), ('aa-bb-cc-dd-ee-ff', 48),
+    ('aa:bb:cc:dd:ee:ff', 32), ('aa:bb:cc:dd:ee:ff:00', 48),
+    ('10.0.1.7', 32), ('255.255.255.255', 32), ('10.0.1', 32),
+    ('0001.0.0.1', 32), ('1000.0.0.1', 32), ('10.0.0.1', 48),
+    ('\x01', 8), ('ab', 16), (1.5, 16), (None, 8),
+])
+def test_auto_encoder_equals_encode(value, bitwidth):
+    assert _outcome(makeEncoder(bitwidth), value) == \
+           _outcome(encode, value, bitwidth)
+
+@pytest.mark.parametrize('kind, value, bitwidth', [
+    ('int', 300, 9), ('mac', 'aa:bb:cc:dd:ee:ff', 48),
+    ('ipv4', '10.0.2.2', 32),
+])
+def test_declared_encoder_equals_encode(kind, value, bitwidth):
+    assert makeEncoder(bitwidth, kind)(value) == encode(value, bitwidth)
+
+def test_declared_encoder_checks_width():
+    with pytest.raises(ValueError):
+        makeEncoder(32, 'mac')
+    with pytest.raises(ValueError):
+        makeEncoder(48, 'ipv4')
+    with pytest.raises(ValueError):
+        makeEncoder(8, 'float')
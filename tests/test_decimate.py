@@ -0,0 +1,37 @@
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(
+    os.path.realpath(__file__))), 'exps'))
+
+import numpy as np
+
+from lib.decimate import minmax_decimate
+
+def _check_extremes(x, y, columns, dx, dy):
+    # every bin keeps its min and max
+    width = (x[-1] - x[0]) / columns
+    bins = np.minimum(((x - x[0]) / width).astype(np.int64), columns - 1)
+    dbins = np.minimum(((dx - x[0]) / width).astype(np.int64), columns - 1)
+    for b in np.unique(bins):
+        assert dy[dbins == b].min() == y[bins == b].min()
+        assert dy[dbins == b].max() == y[bins == b].max()
+
+def test_minmax_gapped_x():
+    rng = np.random.default_rng(1)
+    x = np.concatenate((np.linspace(0, 10, 500), np.linspace(50, 100, 500)))
+    y = rng.normal(size=len(x))
+    dx, dy = minmax_decimate(x, y, 40)
+    assert len(dx) <= 4 * 40
+    assert dx[0] == x[0] and dx[-1] == x[-1]
+    _check_extremes(x, y, 40, dx, dy)
+
+def test_minmax_x_shorter_than_columns():
+    x = np.arange(30, dtype=np.float64)
+    y = np.sin(x)
+    dx, dy = minmax_decimate(x, y, 100)
+    assert np.array_equal(dx, x) and np.array_equal(dy, y)
+    # fewer points than 4 * columns but more than columns, with gaps
+    x = np.concatenate((np.arange(0, 60), np.arange(900, 960))).astype(
+        np.float64)
+    y = np.cos(x)
+    dx, dy = minmax_decimate(x, y, 25)
+    _check_extremes(x, y, 25, dx, dy)
@@ -0,0 +1,87 @@
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(
+    os.path.realpath(__file__))), 'exps'))
+
+import random
+
+import pytest
+
+from lib.iperf_follower import IperfFollower
+from lib.iperf_parser import IperfParser
+
+HEADER = (
+    '------------------------------------------------------------\n'
+    'Server listening on UDP port 5001\n'
+    '------------------------------------------------------------\n'
+    '[  3] local 10.1.1.1 port 5001 connected with 10.0.1.1 port 43210\n'
+    '[ ID] Interval       Transfer     Bandwidth        Jitter   '
+    'Lost/Total Datagrams\n'
+)
+
+def _random_lines(count, seed=1):
+    rng = random.Random(seed)
+    lines = []
+    for i in range(count):
+        transfer_unit = rng.choice(['', 'K', 'M', 'G'])
+        bandwidth_unit = rng.choice(['', 'K', 'M', 'G'])
+        lines.append(
+            '[  3] %4.1f-%4.1f sec  %s %sBytes  %s %sbits/sec   0.012 ms    '
+            '0/  213 (0%%)\n' % (
+                i * 0.5, (i + 1) * 0.5,
+                rng.choice(['%d' % rng.randint(0, 9999),
+                            '%.2f' % rng.uniform(0, 999)]), transfer_unit,
+                rng.choice(['%d' % rng.randint(0, 99999),
+                            '%.2f' % rng.uniform(0, 9999),
+                            '%.3f' % rng.uniform(0, 9)]), bandwidth_unit))
+    return lines
+
+def _fields(entries):
+    return [(e.start_time_str, e.end_time_str, e.transfer_bytes, e.bandwidth)
+            for e in entries]
+
+@pytest.fixture
+def iperf_file(tmp_path):
+    path = tmp_path / 'A2FQ_server_1'
+    path.write_text(HEADER + ''.join(_random_lines(5000)))
+    return str(path)
+
+def test_fast_paths_match_slow_path(iperf_file):
+    slow = _fields(IperfParser(fast_path=False).iter_entries(iperf_file))
+    parser = IperfParser()
+    assert len(slow) == 5000
+    assert _fields(parser.iter_entries(iperf_file)) == slow
+    assert _fields(parser.iter_entries_mmap(iperf_file)) == slow
+    # chunks much smaller than the file, and a missing trailing newline
+    assert _fields(parser.iter_entries_mmap(iperf_file,
+                                            chunk_size=1000)) == slow
+
+def test_last_line_without_newline(tmp_path):
+    path = tmp_path / 'A2FQ_server_1'
+    path.write_text(HEADER + ''.join(_random_lines(3)).rstrip('\n'))
+    slow = _fields(IperfParser(fast_path=False).iter_entries(str(path)))
+    assert len(slow) == 3
+    assert _fields(IperfParser().iter_entries_mmap(str(path))) == slow
+    line = ''.join(_random_lines(3)).splitlines()[-1]
+    parser = IperfParser()
+    assert _fields([parser.parse_line_bytes(line.encode('ascii'))]) == \
+           _fields([parser._parse_line(line)])
+
+def test_non_report_lines_are_skipped(tmp_path):
+    lines = _random_lines(4)
+    lines.insert(2, '[  3]  1.0- 1.5 sec  1 datagrams received out-of-order\n')
+    lines.append('[  3] Sent 4253 datagrams\n')
+    lines.append('[  3] WARNING: did not receive ack of last datagram '
+                 'after 10 tries.')
+    path = tmp_path / 'A2FQ_client_1'
+    path.write_text(HEADER + ''.join(lines))
+    slow = _fields(IperfParser(fast_path=False).iter_entries(str(path)))
+    assert len(slow) == 4
+    parser = IperfParser()
+    assert _fields(parser.iter_entries(str(path))) == slow
+    assert _fields(parser.iter_entries_mmap(str(path))) == slow
+    assert _fields(parser.iter_entries_mmap(str(path), chunk_size=100)) == slow
+
+    follower = IperfFollower(str(path))
+    follower.poll()
+    assert _fields(follower.iperf_data.get_entry(i)
+                   for i in range(follower.iperf_data.size())) == slow
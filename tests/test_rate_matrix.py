@@ -0,0 +1,37 @@
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(
+    os.path.realpath(__file__))), 'exps'))
+
+import numpy as np
+
+from lib.iperf_column_data import IperfColumnData
+from lib.rate_matrix import build_aligned_rate_matrix
+
+def _make_data(starts, ends, mbps):
+    ends = np.asarray(ends, dtype=np.float64)
+    starts = np.asarray(starts, dtype=np.float64)
+    bandwidths = np.full(len(starts), mbps)
+    transfer_bytes = (bandwidths * 1e6 * (ends - starts) / 8).astype(np.int64)
+    return IperfColumnData(starts, ends, transfer_bytes, bandwidths)
+
+def test_gap_between_entries_is_nan():
+    # 2.0-3.0 sec is missing
+    data = _make_data([0, 1, 3], [1, 2, 4], 10.0)
+    for method in ('bucket', 'interp'):
+        edges, rate_matrix = build_aligned_rate_matrix(
+            [data], [0.0], step=1.0, method=method)
+        assert list(edges) == [0, 1, 2, 3, 4]
+        assert np.isnan(rate_matrix[0, 2])
+        assert np.allclose(rate_matrix[0, [0, 1, 3]], 10.0)
+
+def test_slot_partly_in_gap_is_nan():
+    data = _make_data([0, 1, 3], [1, 2, 4], 10.0)
+    _, rate_matrix = build_aligned_rate_matrix([data], [0.0], step=2.0)
+    assert np.allclose(rate_matrix[0, 0], 10.0)
+    assert np.isnan(rate_matrix[0, 1])
+
+def test_offsets_align_flows():
+    data = _make_data(np.arange(0, 4, 0.5), np.arange(0.5, 4.5, 0.5), 5.0)
+    _, rate_matrix = build_aligned_rate_matrix(
+        [data, data], [0.0, 2.0], step=1.0, t_begin=2.0, t_end=4.0)
+    assert np.allclose(rate_matrix, 5.0)
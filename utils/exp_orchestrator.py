@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+#
+# Run an experiment of exps/ for each of its projects in one process,
+# instead of the run.sh loop of `make run`, `make stop` and fixed sleeps.
+#
+# Usage (root is needed by mininet):
+#     sudo python3 utils/exp_orchestrator.py -e exps/convergence_udp_dumbbell
+import os, sys, json, subprocess, argparse, socket
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                             'topo_generators'))
+from mininet.clean import cleanup
+
+from netstat import check_listening_on_port
+from exp_parameters import source_parameters
+from run_exercise import ExerciseRunner
+from dumbbell_generator import DumbbellGenerator
+from mininet_exp_lib.flow_schedule import FlowSpec, save_flow_schedule
+
+BMV2_SWITCH_EXE = 'simple_switch_grpc'
+TOPO_JSON = 'dumbbell-topo/topology.json'
+TEARDOWN_TIMEOUT = 60   # sec
+
+class ExpParams:
+    """Parameters of one experiment, read once from its `parameters` file.
+
+       Attributes:
+           exp_dir : string         // experiment directory, e.g. exps/xxx
+           values : dict            // all variables of the parameters file
+           exp_data_dir : string    // absolute path of the data directory
+           project_dirs : list      // absolute paths of the P4 projects
+           dumbbell_pairs : int
+           group_flows : int        // 1 if not in the parameters file
+           flow_enter_interval : int    // unit: sec
+           link_delay : string
+           link_bandwidth : float   // unit: Mbps
+    """
+
+    def __init__(self, exp_dir: str):
+        self.exp_dir = os.path.abspath(exp_dir)
+        self.values = source_parameters(os.path.join(self.exp_dir,
+                                                     'parameters'))
+        self.exp_data_dir = self.__get_path(self.values['exp_data_dir'])
+        self.project_dirs = [self.__get_path(project_dir) for project_dir
+                             in self.values['exp_projects']]
+        self.dumbbell_pairs = int(self.values['dumbbell_pairs'])
+        self.group_flows = int(self.values.get('group_flows', 1))
+        self.flow_enter_interval = int(self.values['flow_enter_interval'])
+        self.link_delay = self.values['link_delay']
+        self.link_bandwidth = float(self.values['link_bandwidth'])
+
+    def __get_path(self, path: str) -> str:
+        return os.path.normpath(os.path.join(self.exp_dir, path))
+
+    def get_flows_duration(self) -> int:
+        """Seconds from the first flow start to the last flow stop,
+        see client.sh.
+        """
+        group_num = self.dumbbell_pairs // self.group_flows
+        return ((group_num - 1) * 2 + 1) * self.flow_enter_interval
+
+    def get_flow_schedule(self, project_name: str) -> list:
+        """The flows of client.sh/server.sh as a FlowScheduleExp schedule.
+
+        Returns:
+            list of FlowSpec
+        """
+        group_num = self.dumbbell_pairs // self.group_flows
+        flows = []
+        for host_id in range(1, self.dumbbell_pairs + 1):
+            group_id = (host_id + self.group_flows - 1) // self.group_flows
+            flows.append(FlowSpec(
+                client=host_id,
+                server=host_id + self.dumbbell_pairs,
+                start=(group_id - 1) * self.flow_enter_interval,
+                duration=((group_num - 1) * 2 + 1 - (group_id - 1) * 2)
+                         * self.flow_enter_interval,
+                rate=self.values['udp_bandwidth'],
+                protocol='udp',
+                interval=float(self.values['iperf_test_gap']),
+                client_file='%s_%s%d' % (project_name,
+                                         self.values['client_data_prefix'],
+                                         host_id),
+                server_file='%s_%s%d' % (project_name,
+                                         self.values['server_data_prefix'],
+                                         host_id),
+            ))
+        return flows
+
+    def write_side_files(self, project_name: str):
+        """Write the files client.sh/server.sh read their settings from."""
+        side_values = {
+            'exp_data_dir': self.exp_data_dir,
+            'project_name': project_name,
+            'flow_enter_interval': self.flow_enter_interval,
+            'group_flows': self.group_flows,
+            'dumbbell_pairs': self.dumbbell_pairs,
+        }
+        if 'group_flows' not in self.values:
+            del side_values['group_flows']
+        for file_name in side_values:
+            with open(os.path.join(self.exp_dir, file_name), 'w') as f:
+                f.write('%s\n' % side_values[file_name])
+
+class ExpOrchestrator:
+    """Run one experiment on every project of its parameters.
+
+       Attributes:
+           params : ExpParams
+           exp_type : string    // mininet_exp_lib class, e.g. DumbbellExp
+           wait_margin : int    // sec added to the flows duration
+           build : bool         // compile the P4 program before running
+           quiet : bool
+           isolation : dict     // ExerciseRunner node_prefix, grpc_port,
+                                // thrift_port and device_id of this
+                                // instance, empty if it runs alone
+           log_dir : string     // None for <project_dir>/logs
+    """
+
+    def __init__(self, params: ExpParams, exp_type='DumbbellExp',
+                 wait_margin=60, build=True, quiet=False, isolation=None,
+                 log_dir=None):
+        self.params = params
+        self.exp_type = exp_type
+        self.wait_margin = wait_margin
+        self.build = build
+        self.quiet = quiet
+        self.isolation = isolation if isolation is not None else {}
+        self.log_dir = log_dir
+
+    def logger(self, *items):
+        if not self.quiet:
+            print('[ExpOrchestrator]:', ' '.join(items))
+
+    def wait_teardown(self, grpc_ports: list, timeout=TEARDOWN_TIMEOUT):
+        """Return once no gRPC port of the last run is listening any more,
+        instead of sleeping a fixed time before the next run.
+        """
+        deadline = time.monotonic() + timeout
+        while any(check_listening_on_port(port) for port in grpc_ports):
+            if time.monotonic() >= deadline:
+                raise Exception('switches still listening on %s after %ds!'
+                                % (grpc_ports, timeout))
+            time.sleep(0.2)
+
+    def run_project(self, project_dir: str) -> dict:
+        """Generate the topology, build, run and tear down one project.
+
+        Returns:
+            dict, metadata of the run
+        """
+        params = self.params
+        project_name = os.path.basename(project_dir)
+        json_name = [name for name in os.listdir(project_dir)
+                     if name.endswith('.p4')][0][:-len('.p4')] + '.json'
+        metadata = {
+            'project': project_name,
+            'exp_type': self.exp_type,
+            'start_time': time.time(),
+            'phases': {},
+        }
+        params.write_side_files(project_name)
+        if self.exp_type == 'FlowScheduleExp':
+            save_flow_schedule(
+                os.path.join(params.exp_dir, 'flow_schedule.json'),
+                params.exp_data_dir, params.get_flow_schedule(project_name),
+                starts_file='%s_flow_starts.json' % project_name
+            )
+
+        begin = time.monotonic()
+        DumbbellGenerator(params.dumbbell_pairs, params.link_delay,
+                          project_dir, params.link_bandwidth
+                          ).generate_topology()
+        if self.build:
+            subprocess.run(['make', 'build'], cwd=project_dir, check=True)
+        metadata['phases']['prepare'] = time.monotonic() - begin
+
+        begin = time.monotonic()
+        cwd = os.getcwd()
+        os.chdir(project_dir)
+        try:
+            log_dir = self.log_dir if self.log_dir is not None \
+                      else os.path.join(project_dir, 'logs')
+            os.makedirs(log_dir, exist_ok=True)
+            runner = ExerciseRunner(
+                TOPO_JSON, log_dir,
+                os.path.join(project_dir, 'pcaps'),
+                os.path.join('build', json_name), BMV2_SWITCH_EXE,
+                quiet=self.quiet, disable_debug=True, no_pcap=True,
+                exp=self.exp_type,
+                wait=params.get_flows_duration() + self.wait_margin,
+                script_dir=params.exp_dir, **self.isolation)
+            runner.run_exercise()
+        finally:
+            os.chdir(cwd)
+        metadata['phases']['run'] = time.monotonic() - begin
+
+        begin = time.monotonic()
+        grpc_ports = [switch.grpc_port for switch in runner.net.switches
+                      if hasattr(switch, 'grpc_port')]
+        if not self.isolation:
+            # like `mn -c`, which would also kill the other instances
+            # of a parallel sweep
+            cleanup()
+        self.wait_teardown(grpc_ports)
+        metadata['phases']['teardown'] = time.monotonic() - begin
+        metadata['end_time'] = time.time()
+        return metadata
+
+    def run(self) -> list:
+        """Run every project, save metadata to
+        <exp_data_dir>/exp_metadata.json.
+
+        Returns:
+            list of dict, metadata of each project run
+        """
+        params = self.params
+        os.makedirs(params.exp_data_dir, exist_ok=True)
+        with open(os.path.join(params.exp_dir, 'parameters'), 'r') as src:
+            with open(os.path.join(params.exp_data_dir, 'parameters'),
+                      'w') as dst:
+                dst.write(src.read())
+        runs = []
+        for project_dir in params.project_dirs:
+            self.logger('running %s' % project_dir)
+            runs.append(self.run_project(project_dir))
+            self.save_metadata(runs)
+        self.logger('exp data saved in %s' % params.exp_data_dir)
+        return runs
+
+    def save_metadata(self, runs: list):
+        metadata = {
+            'exp_dir': self.params.exp_dir,
+            'parameters': self.params.values,
+            'host': socket.gethostname(),
+            'git_commit': get_git_commit(self.params.exp_dir),
+            'runs': runs,
+        }
+        metadata_path = os.path.join(self.params.exp_data_dir,
+                                     'exp_metadata.json')
+        with open(metadata_path, 'w') as f:
+            json.dump(metadata, f, indent=1)
+
+def get_git_commit(path: str):
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=path,
+                              check=True, capture_output=True,
+                              text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def get_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-e', '--exp_dir', help='Experiment dir, e.g. '
+                        'exps/convergence_udp_dumbbell',
+                        type=str, required=True)
+    parser.add_argument('-t', '--exp_type', help='Experiment to run',
+                        type=str, required=False, default='DumbbellExp')
+    parser.add_argument('-m', '--wait_margin',
+                        help='Waiting time(unit:s) after the last flow stops',
+                        type=int, required=False, default=60)
+    parser.add_argument('-n', '--no_build', help='Do not compile P4 programs',
+                        action='store_true', required=False, default=False)
+    parser.add_argument('-q', '--quiet', help='Suppress log messages.',
+                        action='store_true', required=False, default=False)
+    parser.add_argument('-l', '--log_dir', help='Switch log dir',
+                        type=str, required=False, default=None)
+    parser.add_argument('--node_prefix', help='Prefix of mininet node names',
+                        type=str, required=False, default=None)
+    parser.add_argument('--grpc_port', help='First switch gRPC port',
+                        type=int, required=False, default=None)
+    parser.add_argument('--thrift_port', help='First switch thrift port',
+                        type=int, required=False, default=None)
+    parser.add_argument('--device_id', help='First switch device id',
+                        type=int, required=False, default=None)
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = get_args()
+    isolation = {name: getattr(args, name) for name
+                 in ['node_prefix', 'grpc_port', 'thrift_port', 'device_id']
+                 if getattr(args, name) is not None}
+    orchestrator = ExpOrchestrator(ExpParams(args.exp_dir), args.exp_type,
+                                   args.wait_margin, not args.no_build,
+                                   args.quiet, isolation, args.log_dir)
+    orchestrator.run()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+#
+# Read the `parameters` file of an experiment of exps/, the one next to
+# run.sh or the copy run.sh leaves in each exp data dir.
+import os, subprocess, shlex, re
+
+# `declare -p` output: declare -<flags> name=value
+DECLARE_RE = re.compile(r'^declare -(?P<flags>\S+) (?P<name>\w+)=(?P<value>.*)$')
+ARRAY_ITEM_RE = re.compile(r'\[\d+\]=("(?:[^"\\]|\\.)*"|\S*)')
+
+def source_parameters(parameters_path: str) -> dict:
+    """Evaluate a `parameters` file with bash, exactly like run.sh does,
+    e.g. `$(date ...)` in exp_data_dir is expanded once here.
+
+    Returns:
+        dict, variable name -> string, or list of string for arrays
+    """
+    # variables of a bare bash, then every variable after sourcing
+    script = ':; compgen -v; echo; source "$1" > /dev/null; declare -p'
+    output = subprocess.run(['bash', '--norc', '--noprofile', '-c', script,
+                             'bash', os.path.abspath(parameters_path)],
+                            cwd=os.path.dirname(os.path.abspath(
+                                parameters_path)),
+                            env={'PATH': os.environ.get('PATH', '')},
+                            check=True, capture_output=True, text=True).stdout
+    builtin_names, _, output = output.partition('\n\n')
+    builtin_names = set(builtin_names.split())
+    values = {}
+    for line in output.splitlines():
+        m = DECLARE_RE.match(line)
+        if m is None or m.group('name') in builtin_names:
+            continue
+        if 'a' in m.group('flags'):
+            values[m.group('name')] = [
+                shlex.split(item)[0] if item else ''
+                for item in ARRAY_ITEM_RE.findall(m.group('value'))
+            ]
+        else:
+            values[m.group('name')] = shlex.split(m.group('value'))[0] \
+                                      if m.group('value') else ''
+    return values
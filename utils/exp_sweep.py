@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+#
+# Run an experiment of exps/ over a grid of parameter values, several
+# isolated mininet instances at a time.
+#
+# Usage (root is needed by mininet):
+#     sudo python3 utils/exp_sweep.py -e exps/convergence_udp_dumbbell_multiflow \
+#         -p dumbbell_pairs=16,20,24 -p udp_bandwidth=8M,9M -j 6
+#
+# Every run gets a copy of the experiment scripts with its own parameters
+# and side files, copies of the built P4 projects for its own topology,
+# and its own mininet node names, gRPC/thrift ports, device ids and log
+# directory. Sweep layout:
+#     <sweep_dir>/scripts/lib         -> exps/lib
+#     <sweep_dir>/scripts/run_<k>/    parameters, client.sh, projects/...
+#     <sweep_dir>/data/run_<k>/       exp data of run k
+#     <sweep_dir>/logs/run_<k>/       switch and orchestrator logs
+#     <sweep_dir>/sweep.json          parameters and status of all runs
+import os, sys, json, subprocess, shutil, re, argparse
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from exp_orchestrator import source_parameters
+
+UTILS_DIR = os.path.dirname(os.path.realpath(__file__))
+ORCHESTRATOR = os.path.join(UTILS_DIR, 'exp_orchestrator.py')
+# ports and device ids reserved for each run, enough for the switches
+# of all projects of one run
+RUN_ID_STRIDE = 100
+GRPC_PORT_BASE = 50051
+THRIFT_PORT_BASE = 9090
+# bmv2 switches and iperf of one dumbbell run keep several cores busy
+CPUS_PER_RUN = 8
+
+def expand_grid(grid: dict) -> list:
+    """All combinations of grid values, the last name varies fastest.
+
+    Parameters:
+        grid: dict, parameter name -> list of values
+    Returns:
+        list of dict, parameter name -> value
+    """
+    names = list(grid)
+    return [dict(zip(names, values))
+            for values in itertools.product(*[grid[name] for name in names])]
+
+def _format_value(value) -> str:
+    if isinstance(value, (list, tuple)):
+        return '(%s)' % ' '.join('"%s"' % item for item in value)
+    return '"%s"' % value
+
+def rewrite_parameters(text: str, overrides: dict) -> str:
+    """Set variables of a `parameters` file, keeping its other lines.
+
+    Every assignment of an overridden variable is replaced, variables not
+    in the file are appended.
+    """
+    for name, value in overrides.items():
+        line_re = re.compile(r'^(\s*(?:readonly\s+)?)%s=.*$' % re.escape(name),
+                             re.MULTILINE)
+        line = '%s=%s' % (name, _format_value(value))
+        text, count = line_re.subn(lambda m: m.group(1) + line, text)
+        if count == 0:
+            text = text.rstrip('\n') + '\nreadonly %s\n' % line
+    return text
+
+class SweepRun:
+    """One point of the parameter grid.
+
+       Attributes:
+           index : int              // position in the grid
+           overrides : dict         // parameter name -> value
+           script_dir : string      // experiment scripts of this run
+           data_dir : string        // exp_data_dir of this run
+           log_dir : string
+           isolation : dict         // see ExpOrchestrator
+    """
+
+    def __init__(self, index: int, overrides: dict, sweep_dir: str):
+        self.index = index
+        self.overrides = overrides
+        name = 'run_%03d' % index
+        self.script_dir = os.path.join(sweep_dir, 'scripts', name)
+        self.data_dir = os.path.join(sweep_dir, 'data', name)
+        self.log_dir = os.path.join(sweep_dir, 'logs', name)
+        self.isolation = {
+            'node_prefix': 'r%d' % index,
+            'grpc_port': GRPC_PORT_BASE + index * RUN_ID_STRIDE,
+            'thrift_port': THRIFT_PORT_BASE + index * RUN_ID_STRIDE,
+            'device_id': index * RUN_ID_STRIDE,
+        }
+
+class ExpSweep:
+    """Run an experiment for every point of a parameter grid.
+
+       Attributes:
+           exp_dir : string     // experiment directory, e.g. exps/xxx
+           runs : list          // SweepRun of each grid point
+           sweep_dir : string
+           parallel : int       // runs at the same time
+           wait_margin : int    // see ExpOrchestrator
+    """
+
+    def __init__(self, exp_dir: str, grid: dict, sweep_dir: str,
+                 parallel=None, wait_margin=60):
+        self.exp_dir = os.path.abspath(exp_dir)
+        self.sweep_dir = os.path.abspath(sweep_dir)
+        self.runs = [SweepRun(index, overrides, self.sweep_dir)
+                     for index, overrides in enumerate(expand_grid(grid))]
+        if parallel is None:
+            parallel = max(1, (os.cpu_count() or 1) // CPUS_PER_RUN)
+        self.parallel = parallel
+        self.wait_margin = wait_margin
+
+    def __get_project_dirs(self) -> list:
+        values = source_parameters(os.path.join(self.exp_dir, 'parameters'))
+        return [os.path.normpath(os.path.join(self.exp_dir, project_dir))
+                for project_dir in values['exp_projects']]
+
+    def prepare(self):
+        """Build each P4 project once and lay out the files of every run."""
+        project_dirs = self.__get_project_dirs()
+        for project_dir in project_dirs:
+            subprocess.run(['make', 'build'], cwd=project_dir, check=True)
+
+        scripts_dir = os.path.join(self.sweep_dir, 'scripts')
+        os.makedirs(scripts_dir, exist_ok=True)
+        # experiment scripts source ../lib/*.sh
+        lib_link = os.path.join(scripts_dir, 'lib')
+        if not os.path.lexists(lib_link):
+            os.symlink(os.path.join(os.path.dirname(self.exp_dir), 'lib'),
+                       lib_link)
+        with open(os.path.join(self.exp_dir, 'parameters'), 'r') as f:
+            parameters = f.read()
+
+        for run in self.runs:
+            os.makedirs(run.script_dir, exist_ok=True)
+            os.makedirs(run.log_dir, exist_ok=True)
+            for name in os.listdir(self.exp_dir):
+                if name.endswith('.sh') and name != 'run.sh':
+                    shutil.copy2(os.path.join(self.exp_dir, name),
+                                 run.script_dir)
+            run_project_dirs = []
+            for project_dir in project_dirs:
+                # own copy, the topology of each run is generated into it
+                project_name = os.path.basename(project_dir)
+                run_project_dir = os.path.join(run.script_dir, 'projects',
+                                               project_name)
+                shutil.copytree(project_dir, run_project_dir,
+                                dirs_exist_ok=True,
+                                ignore=shutil.ignore_patterns(
+                                    'logs', 'pcaps', 'dumbbell-topo',
+                                    'sig-topo'))
+                run_project_dirs.append(run_project_dir)
+            overrides = dict(run.overrides)
+            overrides['exp_data_dir'] = run.data_dir
+            overrides['exp_projects'] = run_project_dirs
+            with open(os.path.join(run.script_dir, 'parameters'), 'w') as f:
+                f.write(rewrite_parameters(parameters, overrides))
+
+    def run_one(self, run: SweepRun) -> dict:
+        """Run the orchestrator of one grid point in its own process."""
+        args = [sys.executable, ORCHESTRATOR, '-e', run.script_dir,
+                '-m', str(self.wait_margin), '-n', '-l', run.log_dir]
+        for name, value in run.isolation.items():
+            args.extend(['--%s' % name, str(value)])
+        begin = time.monotonic()
+        with open(os.path.join(run.log_dir, 'orchestrator.log'), 'w') as log:
+            returncode = subprocess.run(args, stdout=log,
+                                        stderr=subprocess.STDOUT).returncode
+        result = {
+            'index': run.index,
+            'parameters': run.overrides,
+            'data_dir': run.data_dir,
+            'returncode': returncode,
+            'duration': time.monotonic() - begin,
+        }
+        print('[ExpSweep]: run %d %s %s in %.0fs' % (
+            run.index, run.overrides,
+            'finished' if returncode == 0 else 'FAILED', result['duration']))
+        return result
+
+    def run(self) -> list:
+        """Run every grid point, at most self.parallel at a time.
+
+        Returns:
+            list of dict, result of each run, also saved to sweep.json
+        """
+        self.prepare()
+        with ThreadPoolExecutor(max_workers=self.parallel) as executor:
+            results = list(executor.map(self.run_one, self.runs))
+        with open(os.path.join(self.sweep_dir, 'sweep.json'), 'w') as f:
+            json.dump({'exp_dir': self.exp_dir, 'runs': results}, f,
+                      indent=1)
+        return results
+
+def parse_grid(texts: list) -> dict:
+    """['name=v1,v2', ...] -> {'name': ['v1', 'v2'], ...}"""
+    grid = {}
+    for text in texts:
+        name, _, values = text.partition('=')
+        grid[name] = values.split(',')
+    return grid
+
+def get_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-e', '--exp_dir', help='Experiment dir, e.g. '
+                        'exps/convergence_udp_dumbbell',
+                        type=str, required=True)
+    parser.add_argument('-p', '--param', help='Values of one parameter, '
+                        'e.g. dumbbell_pairs=16,20,24, repeatable',
+                        action='append', required=True)
+    parser.add_argument('-d', '--sweep_dir', help='Sweep output dir',
+                        type=str, required=False, default=None)
+    parser.add_argument('-j', '--parallel', help='Runs at the same time',
+                        type=int, required=False, default=None)
+    parser.add_argument('-m', '--wait_margin',
+                        help='Waiting time(unit:s) after the last flow stops',
+                        type=int, required=False, default=60)
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = get_args()
+    sweep_dir = args.sweep_dir
+    if sweep_dir is None:
+        sweep_dir = os.path.join(args.exp_dir, 'sweep_%s' %
+                                 time.strftime('%Y%m%d_%H%M%S'))
+    sweep = ExpSweep(args.exp_dir, parse_grid(args.param), sweep_dir,
+                     args.parallel, args.wait_margin)
+    results = sweep.run()
+    failed = [result['index'] for result in results
+              if result['returncode'] != 0]
+    print('[ExpSweep]: %d runs, failed: %s, saved in %s' % (
+        len(results), failed if failed else 'none', sweep.sweep_dir))
+    sys.exit(1 if failed else 0)
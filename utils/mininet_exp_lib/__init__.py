@@ -1,4 +1,5 @@
 # Author: Guangyu Peng (gypeng2021@163.com)
 
 from mininet_exp_lib.iperf_test import IperfTest
-from mininet_exp_lib.dumbbell_exp import DumbbellExp
\ No newline at end of file
+from mininet_exp_lib.dumbbell_exp import DumbbellExp
+from mininet_exp_lib.flow_schedule import FlowScheduleExp
\ No newline at end of file
@@ -1,5 +1,4 @@
 # Author: Guangyu Peng (gypeng2021@163.com)
-from multiprocessing import Pool
 from time import sleep
 
 from mininet_exp_lib.exp_base import ExpBase
@@ -7,23 +6,28 @@ from mininet_exp_lib.exp_base import ExpBase
 class DumbbellExp(ExpBase):
     CLIENT_SCRIPT = 'client.sh'
     SERVER_SCRIPT = 'server.sh'
-    def __init__(self, mininet, host_num: int):
-        super().__init__(mininet, host_num)
+    SERVER_TIMEOUT = 5      # sec, the old fixed wait for servers
+    # time for servers to write their last reports after clients exit
+    SERVER_DRAIN = 2        # sec
+    def __init__(self, mininet, host_num: int, host_prefix=''):
+        super().__init__(mininet, host_num, host_prefix)
+        # host_id -> launch latency(unit:s) of the last run_exp()
+        self.server_latencies = {}
+        self.client_latencies = {}
 
     def run_exp(self, exp_dir: str, duration: int):
-        with Pool(processes=(self.host_num >> 1)) as server_pool:
-            server_cmd_pattern = exp_dir + self.SERVER_SCRIPT + ' %d &'
-            server_list = []
-            for i in range((self.host_num>>1)+1, self.host_num+1):
-                server_list.append((i, server_cmd_pattern % i))
-            server_pool.starmap(self.host_process, server_list)
-            sleep(5)
-            with Pool(processes=(self.host_num >> 1)) as client_pool:
-                client_cmd_pattern = exp_dir + self.CLIENT_SCRIPT + ' %d &'
-                client_list = []
-                for i in range(1, (self.host_num>>1)+1):
-                    client_list.append((i, client_cmd_pattern % i))
-                client_pool.starmap(self.host_process, client_list)
-        print('[DumbbellExp]: waiting for {}s...'.format(duration))
-        sleep(duration)
-        print('[DumbbellExp]: DumbbellExp finished!')
\ No newline at end of file
+        server_ids = list(range((self.host_num>>1)+1, self.host_num+1))
+        client_ids = list(range(1, (self.host_num>>1)+1))
+        server_cmd_pattern = exp_dir + self.SERVER_SCRIPT + ' %d &'
+        self.server_latencies = self.fan_out(
+            [(i, server_cmd_pattern % i) for i in server_ids])
+        ready_time = self.wait_servers_ready(server_ids, self.SERVER_TIMEOUT)
+        print('[DumbbellExp]: servers ready in {:.1f}s'.format(ready_time))
+        client_cmd_pattern = exp_dir + self.CLIENT_SCRIPT + ' %d &'
+        self.client_latencies = self.fan_out(
+            [(i, client_cmd_pattern % i) for i in client_ids])
+        print('[DumbbellExp]: waiting at most {}s...'.format(duration))
+        done_time = self.wait_clients_done(client_ids, duration)
+        sleep(self.SERVER_DRAIN)
+        print('[DumbbellExp]: DumbbellExp finished in {:.1f}s!'.format(
+            done_time + self.SERVER_DRAIN))
@@ -1,13 +1,111 @@
 # Author: Guangyu Peng (gypeng2021@163.com)
+import re
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep, monotonic
 
 exp_hosts = []
 
 class ExpBase:
-    def __init__(self, mininet, host_num: int):
+    IPERF_PORT = 5001
+    POLL_INTERVAL = 0.2   # sec
+    # threads issuing commands, each one waits on a host shell
+    FAN_OUT_WORKERS = 64
+
+    def __init__(self, mininet, host_num: int, host_prefix=''):
         self.host_num = host_num
+        # hosts of an earlier experiment in the same process are gone
+        exp_hosts.clear()
         exp_hosts.append(None)
         for i in range(1, 1+self.host_num):
-            exp_hosts.append(mininet.get('h%d' % i))
+            exp_hosts.append(mininet.get('%sh%d' % (host_prefix, i)))
 
     def host_process(self, host_id: int, command: str):
-        exp_hosts[host_id].cmd(command)
\ No newline at end of file
+        exp_hosts[host_id].cmd(command)
+
+    def __run_host_commands(self, host_id: int, commands: list):
+        begin = monotonic()
+        for command in commands:
+            self.host_process(host_id, command)
+        return monotonic() - begin
+
+    def fan_out(self, host_commands: list, max_workers=None) -> dict:
+        """Run commands on many hosts at the same time from a thread pool.
+
+        Every host has its own shell, so hosts are served concurrently,
+        commands of one host run in order in its shell. Commands should
+        end with `&` to be only launched.
+
+        Parameters:
+            host_commands: list of (host_id, command)
+            max_workers: int, None for min(FAN_OUT_WORKERS, host count)
+        Returns:
+            dict, host_id -> launch latency(unit:s) of its commands
+        """
+        commands = {}
+        for host_id, command in host_commands:
+            commands.setdefault(host_id, []).append(command)
+        if len(commands) == 0:
+            return {}
+        if max_workers is None:
+            max_workers = min(self.FAN_OUT_WORKERS, len(commands))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {host_id: executor.submit(self.__run_host_commands,
+                                                host_id, host_cmds)
+                       for host_id, host_cmds in commands.items()}
+            latencies = {host_id: future.result()
+                         for host_id, future in futures.items()}
+        print('[{}]: launched on {} hosts, latency mean {:.1f}ms, '
+              'max {:.1f}ms (h{})'.format(
+                  type(self).__name__, len(latencies),
+                  sum(latencies.values()) / len(latencies) * 1000,
+                  max(latencies.values()) * 1000,
+                  max(latencies, key=latencies.get)))
+        return latencies
+
+    def is_listening(self, host_id: int, port=IPERF_PORT) -> bool:
+        """If a tcp or udp socket of host_id is bound to port, checked
+           inside the network namespace of the host."""
+        output = exp_hosts[host_id].cmd('ss -Hlntu "sport = :%d"' % port)
+        # the interactive host shell may also print job notifications
+        return re.search(r':%d\s' % port, output) is not None
+
+    def has_running_jobs(self, host_id: int) -> bool:
+        """If a command started with `&` in the host shell still runs."""
+        output = exp_hosts[host_id].cmd('jobs -rp')
+        return any(line.strip().isdigit() for line in output.splitlines())
+
+    def wait_hosts(self, host_ids, probe, timeout: float) -> bool:
+        """Poll probe(host_id) until it is True for every host.
+
+        Returns:
+            bool, False if some host still failed the probe at timeout
+        """
+        deadline = monotonic() + timeout
+        pending = list(host_ids)
+        while True:
+            pending = [host_id for host_id in pending if not probe(host_id)]
+            if len(pending) == 0:
+                return True
+            if monotonic() >= deadline:
+                return False
+            sleep(self.POLL_INTERVAL)
+
+    def wait_servers_ready(self, host_ids, timeout: float):
+        """Wait for iperf servers to listen, instead of a fixed sleep."""
+        begin = monotonic()
+        if not self.wait_hosts(host_ids, self.is_listening, timeout):
+            print('[{}]: servers not listening after {}s, go on'.format(
+                type(self).__name__, timeout))
+        return monotonic() - begin
+
+    def wait_clients_done(self, host_ids, timeout: float):
+        """Wait for the client scripts to exit, at most timeout seconds."""
+        begin = monotonic()
+        done = self.wait_hosts(
+            host_ids, lambda host_id: not self.has_running_jobs(host_id),
+            timeout
+        )
+        if not done:
+            print('[{}]: clients still running after {}s'.format(
+                type(self).__name__, timeout))
+        return monotonic() - begin
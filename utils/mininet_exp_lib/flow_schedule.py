@@ -0,0 +1,197 @@
+import json
+import os
+import subprocess
+import time
+
+from mininet_exp_lib.exp_base import ExpBase, exp_hosts
+
+# last part of each wait is spent spinning, sleep() may wake up late
+SPIN_TIME = 0.002   # sec
+
+class FlowSpec:
+    """One iperf flow of a schedule.
+
+       Attributes:
+           client : int         // client host id, i.e. h<client>
+           server : int         // server host id
+           start : float        // start time after the schedule begins, sec
+           duration : float     // iperf -t, sec
+           rate : string        // iperf -b, e.g. '10M', None for default
+           protocol : string    // 'udp' | 'tcp'
+           interval : float     // iperf -i, sec
+           client_file : string // client output file name, None to drop
+           server_file : string // server output file name, None to drop
+    """
+
+    def __init__(self, client: int, server: int, start: float,
+                 duration: float, rate=None, protocol='udp', interval=1.0,
+                 client_file=None, server_file=None):
+        if protocol not in ['udp', 'tcp']:
+            raise ValueError('parameter protocol error!')
+        self.client = client
+        self.server = server
+        self.start = start
+        self.duration = duration
+        self.rate = rate
+        self.protocol = protocol
+        self.interval = interval
+        self.client_file = client_file
+        self.server_file = server_file
+
+    @classmethod
+    def from_dict(cls, flow: dict):
+        return cls(**flow)
+
+    def to_dict(self) -> dict:
+        return dict(vars(self))
+
+    def get_client_args(self, server_ip: str) -> list:
+        args = ['iperf', '-c', server_ip, '-i', str(self.interval),
+                '-t', str(self.duration)]
+        if self.protocol == 'udp':
+            args.append('-u')
+        if self.rate is not None:
+            args.extend(['-b', str(self.rate)])
+        return args
+
+    def get_server_args(self) -> list:
+        args = ['iperf', '-s', '-i', str(self.interval)]
+        if self.protocol == 'udp':
+            args.append('-u')
+        return args
+
+def load_flow_schedule(filepath: str):
+    """Read a schedule file, see save_flow_schedule().
+
+    Returns:
+        (data_dir, starts_file, list of FlowSpec)
+    """
+    with open(filepath, 'r') as f:
+        schedule = json.load(f)
+    return schedule['data_dir'], schedule['starts_file'], \
+           [FlowSpec.from_dict(flow) for flow in schedule['flows']]
+
+def save_flow_schedule(filepath: str, data_dir: str, flows: list,
+                       starts_file='flow_starts.json'):
+    """Write a schedule file:
+        {"data_dir": ..., "starts_file": ...,
+         "flows": [{"client": 1, "server": 21, "start": 0.0, ...}, ...]}
+
+    Output files of the flows and starts_file, the actual start times,
+    go to data_dir.
+    """
+    with open(filepath, 'w') as f:
+        json.dump({'data_dir': data_dir,
+                   'starts_file': starts_file,
+                   'flows': [flow.to_dict() for flow in flows]}, f, indent=1)
+
+def wait_until(deadline: float):
+    """Return at time.monotonic() deadline, sleeping most of the way."""
+    remaining = deadline - time.monotonic()
+    if remaining > SPIN_TIME:
+        time.sleep(remaining - SPIN_TIME)
+    while time.monotonic() < deadline:
+        pass
+
+class FlowScheduleExp(ExpBase):
+    """Start iperf flows of a declarative schedule from this process, each
+       at its own monotonic clock deadline, instead of a sleep in a shell
+       script of every host.
+
+       The schedule is read from <exp_dir>/flow_schedule.json, see
+       save_flow_schedule().
+    """
+    SCHEDULE_FILE = 'flow_schedule.json'
+    # longest wait for the servers to listen before the schedule begins
+    SERVER_TIMEOUT = 1.0    # sec
+    SERVER_DRAIN = 2    # sec
+
+    def __init__(self, mininet, host_num: int, host_prefix=''):
+        super().__init__(mininet, host_num, host_prefix)
+        self.server_procs = []
+        self.client_procs = []
+
+    def __popen(self, host_id: int, args: list, file_name, data_dir: str):
+        if file_name is None:
+            out = subprocess.DEVNULL
+        else:
+            out = open(os.path.join(data_dir, file_name), 'w')
+        try:
+            return exp_hosts[host_id].popen(args, stdout=out,
+                                            stderr=subprocess.STDOUT)
+        finally:
+            if file_name is not None:
+                out.close()
+
+    def start_servers(self, flows: list, data_dir: str):
+        started = set()
+        for flow in flows:
+            if flow.server in started:
+                continue
+            started.add(flow.server)
+            self.server_procs.append(self.__popen(
+                flow.server, flow.get_server_args(), flow.server_file,
+                data_dir
+            ))
+
+    def start_clients(self, flows: list, data_dir: str, begin: float):
+        """Start each client at begin + flow.start on the monotonic clock.
+
+        Returns:
+            list of dict, scheduled and actual start of each flow
+        """
+        starts = []
+        for flow in sorted(flows, key=lambda flow: flow.start):
+            deadline = begin + flow.start
+            server_ip = exp_hosts[flow.server].IP()
+            wait_until(deadline)
+            self.client_procs.append(self.__popen(
+                flow.client, flow.get_client_args(server_ip),
+                flow.client_file, data_dir
+            ))
+            started = time.monotonic()
+            starts.append({
+                'client': flow.client,
+                'server': flow.server,
+                'scheduled': flow.start,
+                'actual': started - begin,
+                'lateness': started - deadline,
+                'wall_time': time.time(),
+            })
+        return starts
+
+    def run_exp(self, exp_dir: str, duration: int):
+        data_dir, starts_file, flows = load_flow_schedule(
+            os.path.join(exp_dir, self.SCHEDULE_FILE)
+        )
+        os.makedirs(data_dir, exist_ok=True)
+        self.start_servers(flows, data_dir)
+        # every server listens on the default iperf port, tcp or udp
+        self.wait_servers_ready(sorted(set(flow.server for flow in flows)),
+                                self.SERVER_TIMEOUT)
+        begin = time.monotonic()
+        print('[FlowScheduleExp]: starting {} flows...'.format(len(flows)))
+        starts = self.start_clients(flows, data_dir, begin)
+        with open(os.path.join(data_dir, starts_file), 'w') as f:
+            json.dump(starts, f, indent=1)
+        print('[FlowScheduleExp]: max start lateness {:.3f}ms'.format(
+            max([start['lateness'] for start in starts], default=0) * 1000))
+
+        # duration counts from the schedule begin, like DumbbellExp, stop
+        # earlier once every client exits
+        print('[FlowScheduleExp]: waiting at most {}s...'.format(duration))
+        deadline = begin + duration
+        while time.monotonic() < deadline and \
+              any(proc.poll() is None for proc in self.client_procs):
+            time.sleep(min(self.POLL_INTERVAL,
+                           max(deadline - time.monotonic(), 0)))
+        # servers write their last reports after the clients exit
+        time.sleep(min(self.SERVER_DRAIN,
+                       max(deadline - time.monotonic(), 0)))
+        for proc in self.client_procs + self.server_procs:
+            if proc.poll() is None:
+                proc.terminate()
+        for proc in self.client_procs + self.server_procs:
+            proc.wait()
+        print('[FlowScheduleExp]: FlowScheduleExp finished in {:.1f}s!'.format(
+            time.monotonic() - begin))
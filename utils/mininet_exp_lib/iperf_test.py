@@ -1,5 +1,4 @@
 # Author: Guangyu Peng (gypeng2021@163.com)
-from multiprocessing import Pool
 from time import sleep
 
 from mininet_exp_lib.exp_base import ExpBase
@@ -7,22 +6,20 @@ from mininet_exp_lib.exp_base import ExpBase
 class IperfTest(ExpBase):
     CLIENT_SCRIPT = 'client.sh'
     SERVER_SCRIPT = 'server.sh'
-    def __init__(self, mininet, host_num: int):
-        super().__init__(mininet, host_num)
+    SERVER_TIMEOUT = 1      # sec, the old fixed wait for the server
+    # time for the server to write its last report after the client exits
+    SERVER_DRAIN = 2        # sec
+    def __init__(self, mininet, host_num: int, host_prefix=''):
+        super().__init__(mininet, host_num, host_prefix)
 
     def run_exp(self, exp_dir: str, duration: int):
-        with Pool(processes=1) as server_pool:
-            server_pool.starmap(
-                self.host_process, 
-                [((self.host_num >> 1) + 1, 
-                  exp_dir+self.SERVER_SCRIPT+' &')]
-            )
-            sleep(1)
-            with Pool(processes=1) as client_pool:
-                client_pool.starmap(
-                    self.host_process,
-                    [(1, exp_dir+self.CLIENT_SCRIPT+' &')]
-                )
-        print('[IperfTest]: waiting for {}s...'.format(duration))
-        sleep(duration)
-        print('[IperfTest]: IperfTest finished!')
\ No newline at end of file
+        server_id = (self.host_num >> 1) + 1
+        client_id = 1
+        self.fan_out([(server_id, exp_dir+self.SERVER_SCRIPT+' &')])
+        self.wait_servers_ready([server_id], self.SERVER_TIMEOUT)
+        self.fan_out([(client_id, exp_dir+self.CLIENT_SCRIPT+' &')])
+        print('[IperfTest]: waiting at most {}s...'.format(duration))
+        done_time = self.wait_clients_done([client_id], duration)
+        sleep(self.SERVER_DRAIN)
+        print('[IperfTest]: IperfTest finished in {:.1f}s!'.format(
+            done_time + self.SERVER_DRAIN))
@@ -79,7 +79,9 @@ class P4Switch(Switch):
         self.sw_path = sw_path
         self.json_path = json_path
         self.verbose = verbose
-        logfile = "/tmp/p4s.{}.log".format(self.name)
+        # next to log_file, so that each run keeps its own logs
+        log_dir = os.path.dirname(log_file) if log_file else "/tmp"
+        logfile = os.path.join(log_dir, "p4s.{}.log".format(self.name))
         self.output = open(logfile, 'w')
         self.thrift_port = thrift_port
         if check_listening_on_port(self.thrift_port):
@@ -24,7 +24,7 @@ This package contains several helper functions for encoding to and decoding from
 - Ethernet address strings
 '''
 
-mac_pattern = re.compile('^([\da-fA-F]{2}:){5}([\da-fA-F]{2})$')
+mac_pattern = re.compile(r'^([\da-fA-F]{2}:){5}([\da-fA-F]{2})$')
 def matchesMac(mac_addr_string):
     return mac_pattern.match(mac_addr_string) is not None
 
@@ -32,9 +32,9 @@ def encodeMac(mac_addr_string):
     return bytes.fromhex(mac_addr_string.replace(':', ''))
 
 def decodeMac(encoded_mac_addr):
-    return ':'.join(s.hex() for s in encoded_mac_addr)
+    return ':'.join('%02x' % b for b in encoded_mac_addr)
 
-ip_pattern = re.compile('^(\d{1,3}\.){3}(\d{1,3})$')
+ip_pattern = re.compile(r'^(\d{1,3}\.){3}(\d{1,3})$')
 def matchesIPv4(ip_addr_string):
     return ip_pattern.match(ip_addr_string) is not None
 
@@ -49,10 +49,9 @@ def bitwidthToBytes(bitwidth):
 
 def encodeNum(number, bitwidth):
     byte_len = bitwidthToBytes(bitwidth)
-    num_str = '%x' % number
     if number >= 2 ** bitwidth:
         raise Exception("Number, %d, does not fit in %d bits" % (number, bitwidth))
-    return bytes.fromhex('0' * (byte_len * 2 - len(num_str)) + num_str)
+    return number.to_bytes(byte_len, 'big')
 
 def decodeNum(encoded_number):
     return int(encoded_number.hex(), 16)
@@ -78,42 +77,70 @@ def encode(x, bitwidth):
     assert(len(encoded_bytes) == byte_len)
     return encoded_bytes
 
-if __name__ == '__main__':
-    # TODO These tests should be moved out of main eventually
-    mac = "aa:bb:cc:dd:ee:ff"
-    enc_mac = encodeMac(mac)
-    assert(enc_mac == '\xaa\xbb\xcc\xdd\xee\xff')
-    dec_mac = decodeMac(enc_mac)
-    assert(mac == dec_mac)
-
-    ip = "10.0.0.1"
-    enc_ip = encodeIPv4(ip)
-    assert(enc_ip == '\x0a\x00\x00\x01')
-    dec_ip = decodeIPv4(enc_ip)
-    assert(ip == dec_ip)
-
-    num = 1337
-    byte_len = 5
-    enc_num = encodeNum(num, byte_len * 8)
-    assert(enc_num == '\x00\x00\x00\x05\x39')
-    dec_num = decodeNum(enc_num)
-    assert(num == dec_num)
-
-    assert(matchesIPv4('10.0.0.1'))
-    assert(not matchesIPv4('10.0.0.1.5'))
-    assert(not matchesIPv4('1000.0.0.1'))
-    assert(not matchesIPv4('10001'))
-
-    assert(encode(mac, 6 * 8) == enc_mac)
-    assert(encode(ip, 4 * 8) == enc_ip)
-    assert(encode(num, 5 * 8) == enc_num)
-    assert(encode((num,), 5 * 8) == enc_num)
-    assert(encode([num], 5 * 8) == enc_num)
-
-    num = 256
-    byte_len = 2
-    try:
-        enc_num = encodeNum(num, 8)
-        raise Exception("expected exception")
-    except Exception as e:
-        print(e)
+# Encoders of values of one field, chosen once from its bitwidth and the kind
+# of its values instead of inferring the type of each value as encode() does:
+# - 'int': int values
+# - 'mac': Ethernet address strings, the field is 48 bits
+# - 'ipv4': IPv4 address strings, the field is 32 bits
+# - 'auto': any value encode() takes, e.g. int, MAC or IPv4 string
+ENCODER_KINDS = ('auto', 'int', 'mac', 'ipv4')
+
+def encodeMacFast(mac_addr_string):
+    'encodeMac() checking the address format without a regex'
+    if len(mac_addr_string) != 17 or mac_addr_string[2::3] != ':::::':
+        raise ValueError("Not a MAC address %r" % mac_addr_string)
+    return bytes.fromhex(mac_addr_string.replace(':', ''))
+
+def encodeIPv4Fast(ip_addr_string):
+    'encodeIPv4() of dotted quads only, like matchesIPv4(), without a regex'
+    parts = ip_addr_string.split('.')
+    if len(parts) != 4:
+        raise ValueError("Not an IPv4 address %r" % ip_addr_string)
+    for part in parts:
+        if not (0 < len(part) < 4 and part.isdigit()):
+            raise ValueError("Not an IPv4 address %r" % ip_addr_string)
+    return socket.inet_aton(ip_addr_string)
+
+def makeNumEncoder(bitwidth):
+    byte_len = bitwidthToBytes(bitwidth)
+    limit = 2 ** bitwidth
+    def encodeFieldNum(number):
+        if number >= limit:
+            raise Exception("Number, %d, does not fit in %d bits" % (number, bitwidth))
+        return number.to_bytes(byte_len, 'big')
+    return encodeFieldNum
+
+def makeEncoder(bitwidth, kind='auto'):
+    'Returns a function encoding a value of a field of bitwidth, see ENCODER_KINDS'
+    if kind == 'int':
+        return makeNumEncoder(bitwidth)
+    if kind == 'mac':
+        if bitwidth != 48:
+            raise ValueError("MAC address field of %d bits" % bitwidth)
+        return encodeMacFast
+    if kind == 'ipv4':
+        if bitwidth != 32:
+            raise ValueError("IPv4 address field of %d bits" % bitwidth)
+        return encodeIPv4Fast
+    if kind != 'auto':
+        raise ValueError("Unknown encoder kind %r" % kind)
+
+    encode_num = makeNumEncoder(bitwidth)
+    # only addresses of the field size can be encoded
+    if bitwidth == 48:
+        encode_str = encodeMacFast
+    elif bitwidth == 32:
+        encode_str = encodeIPv4Fast
+    else:
+        encode_str = None
+    def encodeField(x):
+        if type(x) == int:
+            return encode_num(x)
+        if type(x) == str and encode_str is not None:
+            try:
+                return encode_str(x)
+            except (ValueError, OSError):
+                pass
+        # anything else, e.g. a 1-element list, or an error message
+        return encode(x, bitwidth)
+    return encodeField
@@ -65,6 +65,37 @@ def parseGrpcErrorBinaryDetails(grpc_error):
     return indexed_p4_errors
 
 
+# Raised by the batched writes of SwitchConnection. Holds the index, among all
+# updates of the write, the update message and the p4.Error of each failed
+# update of the failed batch. When the server sends no per-update details,
+# `errors` is empty and only the gRPC status of the batch is known.
+class P4RuntimeWriteError(Exception):
+    def __init__(self, grpc_error, first_index, updates):
+        self.grpc_error = grpc_error
+        self.first_index = first_index
+        self.batch_size = len(updates)
+        self.errors = []
+        try:
+            p4_errors = parseGrpcErrorBinaryDetails(grpc_error)
+        except P4RuntimeErrorFormatException:
+            p4_errors = None
+        for idx, p4_error in p4_errors or []:
+            update = updates[idx] if idx < len(updates) else None
+            self.errors.append((first_index + idx, update, p4_error))
+        super(P4RuntimeWriteError, self).__init__(self.format())
+
+    def format(self):
+        lines = ["Write of updates {}..{} failed: {} ({})".format(
+            self.first_index, self.first_index + self.batch_size - 1,
+            self.grpc_error.details(), self.grpc_error.code().name)]
+        for idx, update, p4_error in self.errors:
+            code_name = code_pb2._CODE.values_by_number[
+                p4_error.canonical_code].name
+            lines.append("\t* At index {}: {}, '{}'".format(
+                idx, code_name, p4_error.message))
+        return "\n".join(lines)
+
+
 # P4Runtime uses a 3-level message in case of an error during the processing of
 # a write batch. This means that some care is required when printing the
 # exception if we do not want to end-up with a non-helpful message in case of
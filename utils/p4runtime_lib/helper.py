@@ -12,34 +12,124 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
-import re
+import os
+import threading
 
 import google.protobuf.text_format
 from p4.v1 import p4runtime_pb2
 from p4.config.v1 import p4info_pb2
 
-from .convert import encode
+from .convert import makeEncoder
 
-class P4InfoHelper(object):
-    def __init__(self, p4_info_filepath):
-        p4info = p4info_pb2.P4Info()
+# p4info files with these suffixes hold a binary serialized P4Info, others
+# are in protobuf text format
+BINARY_P4INFO_SUFFIXES = ('.bin', '.binpb', '.pb')
+
+# Process-wide cache of loaded p4info files:
+#     real path -> (mtime_ns, size, state of a P4InfoHelper)
+# so each program is parsed once however many switches run it.
+_p4info_cache = {}
+_p4info_cache_lock = threading.Lock()
+
+def loadP4Info(p4_info_filepath):
+    "Parses a text or binary p4info file, see BINARY_P4INFO_SUFFIXES"
+    p4info = p4info_pb2.P4Info()
+    if p4_info_filepath.endswith(BINARY_P4INFO_SUFFIXES):
+        with open(p4_info_filepath, 'rb') as p4info_f:
+            p4info.ParseFromString(p4info_f.read())
+    else:
         # Load the p4info file into a skeleton P4Info object
         with open(p4_info_filepath) as p4info_f:
             google.protobuf.text_format.Merge(p4info_f.read(), p4info)
-        self.p4info = p4info
+    return p4info
+
+def saveP4InfoBinary(p4info, p4info_bin_filepath):
+    "Writes a binary serialized P4Info, loaded much faster than text"
+    with open(p4info_bin_filepath, 'wb') as p4info_f:
+        p4info_f.write(p4info.SerializeToString())
+
+def clearP4InfoCache():
+    with _p4info_cache_lock:
+        _p4info_cache.clear()
+
+class P4InfoHelper(object):
+    def __init__(self, p4_info_filepath):
+        # Helpers of the same unchanged file share the P4Info message and
+        # its indexes, none of them is modified after loading
+        path = os.path.realpath(p4_info_filepath)
+        with _p4info_cache_lock:
+            st = os.stat(path)
+            cached = _p4info_cache.get(path)
+            if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+                vars(self).update(cached[2])
+            else:
+                self.p4info = loadP4Info(path)
+                self._buildIndexes()
+                _p4info_cache[path] = (st.st_mtime_ns, st.st_size, dict(vars(self)))
+        # own copies, changed by set_match_field_kind() and
+        # set_action_param_kind()
+        self._match_field_encoders = dict(self._match_field_encoders)
+        self._action_param_encoders = dict(self._action_param_encoders)
+
+    def save_binary(self, p4info_bin_filepath):
+        saveP4InfoBinary(self.p4info, p4info_bin_filepath)
+
+    def _buildIndexes(self):
+        # entity_type -> {name or alias -> entity}, {id -> entity}, for each
+        # repeated P4Info field whose entities have a preamble, e.g. tables.
+        # The first entity wins on duplicate keys, as with a linear scan.
+        self._entities_by_name = {}
+        self._entities_by_id = {}
+        for field, entities in self.p4info.ListFields():
+            if field.message_type is None or \
+               'preamble' not in field.message_type.fields_by_name:
+                continue
+            by_name = self._entities_by_name[field.name] = {}
+            by_id = self._entities_by_id[field.name] = {}
+            for o in entities:
+                pre = o.preamble
+                by_name.setdefault(pre.name, o)
+                by_name.setdefault(pre.alias, o)
+                by_id.setdefault(pre.id, o)
+        # (table name, match field name or id) -> match field
+        self._match_fields_by_name = {}
+        self._match_fields_by_id = {}
+        for t in self.p4info.tables:
+            for mf in t.match_fields:
+                key = (t.preamble.name, mf.name)
+                self._match_fields_by_name.setdefault(key, mf)
+                key = (t.preamble.name, mf.id)
+                self._match_fields_by_id.setdefault(key, mf)
+        # (table name, match field name) -> encoder of the field values
+        self._match_field_encoders = {
+            key: makeEncoder(mf.bitwidth)
+            for key, mf in self._match_fields_by_name.items()
+        }
+        # (action name, param name or id) -> param
+        self._action_params_by_name = {}
+        self._action_params_by_id = {}
+        for a in self.p4info.actions:
+            for p in a.params:
+                key = (a.preamble.name, p.name)
+                self._action_params_by_name.setdefault(key, p)
+                key = (a.preamble.name, p.id)
+                self._action_params_by_id.setdefault(key, p)
+        # (action name, param name) -> encoder of the param values
+        self._action_param_encoders = {
+            key: makeEncoder(p.bitwidth)
+            for key, p in self._action_params_by_name.items()
+        }
 
     def get(self, entity_type, name=None, id=None):
         if name is not None and id is not None:
             raise AssertionError("name or id must be None")
 
-        for o in getattr(self.p4info, entity_type):
-            pre = o.preamble
-            if name:
-                if (pre.name == name or pre.alias == name):
-                    return o
-            else:
-                if pre.id == id:
-                    return o
+        if name:
+            o = self._entities_by_name.get(entity_type, {}).get(name)
+        else:
+            o = self._entities_by_id.get(entity_type, {}).get(id)
+        if o is not None:
+            return o
 
         if name:
             raise AttributeError("Could not find %r of type %s" % (name, entity_type))
@@ -57,32 +147,39 @@ class P4InfoHelper(object):
 
     def __getattr__(self, attr):
         # Synthesize convenience functions for name to id lookups for top-level entities
-        # e.g. get_tables_id(name_string) or get_actions_id(name_string)
-        m = re.search("^get_(\w+)_id$", attr)
-        if m:
-            primitive = m.group(1)
-            return lambda name: self.get_id(primitive, name)
-
-        # Synthesize convenience functions for id to name lookups
-        # e.g. get_tables_name(id) or get_actions_name(id)
-        m = re.search("^get_(\w+)_name$", attr)
-        if m:
-            primitive = m.group(1)
-            return lambda id: self.get_name(primitive, id)
-
-        raise AttributeError("%r object has no attribute %r" % (self.__class__, attr))
+        # e.g. get_tables_id(name_string) or get_actions_id(name_string),
+        # and for id to name lookups, e.g. get_tables_name(id) or
+        # get_actions_name(id). Each one is stored on the instance, so
+        # later calls do not come here again.
+        if attr.startswith('get_') and attr.endswith('_id') and len(attr) > 7:
+            primitive = attr[4:-3]
+            by_name = self._entities_by_name.get(primitive)
+            if by_name is None:
+                lookup = lambda name: self.get_id(primitive, name)
+            else:
+                def lookup(name):
+                    o = by_name.get(name) if name else None
+                    if o is None:
+                        return self.get_id(primitive, name)
+                    return o.preamble.id
+        elif attr.startswith('get_') and attr.endswith('_name') and \
+             len(attr) > 9:
+            primitive = attr[4:-5]
+            lookup = lambda id: self.get_name(primitive, id)
+        else:
+            raise AttributeError("%r object has no attribute %r" % (self.__class__, attr))
+        setattr(self, attr, lookup)
+        return lookup
 
     def get_match_field(self, table_name, name=None, id=None):
-        for t in self.p4info.tables:
-            pre = t.preamble
-            if pre.name == table_name:
-                for mf in t.match_fields:
-                    if name is not None:
-                        if mf.name == name:
-                            return mf
-                    elif id is not None:
-                        if mf.id == id:
-                            return mf
+        if name is not None:
+            mf = self._match_fields_by_name.get((table_name, name))
+        elif id is not None:
+            mf = self._match_fields_by_id.get((table_name, id))
+        else:
+            mf = None
+        if mf is not None:
+            return mf
         raise AttributeError("%r has no attribute %r" % (table_name, name if name is not None else id))
 
     def get_match_field_id(self, table_name, match_field_name):
@@ -91,29 +188,41 @@ class P4InfoHelper(object):
     def get_match_field_name(self, table_name, match_field_id):
         return self.get_match_field(table_name, id=match_field_id).name
 
-    def get_match_field_pb(self, table_name, match_field_name, value):
+    def set_match_field_kind(self, table_name, match_field_name, kind):
+        """Declares the kind of values of a match field, see
+           convert.ENCODER_KINDS, so they are encoded without checking
+           their type. The default kind 'auto' takes any value.
+        """
         p4info_match = self.get_match_field(table_name, match_field_name)
-        bitwidth = p4info_match.bitwidth
-        p4runtime_match = p4runtime_pb2.FieldMatch()
+        self._match_field_encoders[(table_name, match_field_name)] = \
+            makeEncoder(p4info_match.bitwidth, kind)
+
+    def _fillMatchField(self, p4runtime_match, table_name, match_field_name, value):
+        p4info_match = self.get_match_field(table_name, match_field_name)
+        encode = self._match_field_encoders[(table_name, match_field_name)]
         p4runtime_match.field_id = p4info_match.id
         match_type = p4info_match.match_type
         if match_type == p4info_pb2.MatchField.EXACT:
             exact = p4runtime_match.exact
-            exact.value = encode(value, bitwidth)
+            exact.value = encode(value)
         elif match_type == p4info_pb2.MatchField.LPM:
             lpm = p4runtime_match.lpm
-            lpm.value = encode(value[0], bitwidth)
+            lpm.value = encode(value[0])
             lpm.prefix_len = value[1]
         elif match_type == p4info_pb2.MatchField.TERNARY:
             lpm = p4runtime_match.ternary
-            lpm.value = encode(value[0], bitwidth)
-            lpm.mask = encode(value[1], bitwidth)
+            lpm.value = encode(value[0])
+            lpm.mask = encode(value[1])
         elif match_type == p4info_pb2.MatchField.RANGE:
             lpm = p4runtime_match.range
-            lpm.low = encode(value[0], bitwidth)
-            lpm.high = encode(value[1], bitwidth)
+            lpm.low = encode(value[0])
+            lpm.high = encode(value[1])
         else:
             raise Exception("Unsupported match type with type %r" % match_type)
+
+    def get_match_field_pb(self, table_name, match_field_name, value):
+        p4runtime_match = p4runtime_pb2.FieldMatch()
+        self._fillMatchField(p4runtime_match, table_name, match_field_name, value)
         return p4runtime_match
 
     def get_match_field_value(self, match_field):
@@ -132,17 +241,17 @@ class P4InfoHelper(object):
             raise Exception("Unsupported match type with type %r" % match_type)
 
     def get_action_param(self, action_name, name=None, id=None):
-        for a in self.p4info.actions:
-            pre = a.preamble
-            if pre.name == action_name:
-                for p in a.params:
-                    if name is not None:
-                        if p.name == name:
-                            return p
-                    elif id is not None:
-                        if p.id == id:
-                            return p
-        raise AttributeError("action %r has no param %r, (has: %r)" % (action_name, name if name is not None else id, a.params))
+        if name is not None:
+            p = self._action_params_by_name.get((action_name, name))
+        elif id is not None:
+            p = self._action_params_by_id.get((action_name, id))
+        else:
+            p = None
+        if p is not None:
+            return p
+        params = [p.name for (a, _), p in self._action_params_by_name.items()
+                  if a == action_name]
+        raise AttributeError("action %r has no param %r, (has: %r)" % (action_name, name if name is not None else id, params))
 
     def get_action_param_id(self, action_name, param_name):
         return self.get_action_param(action_name, name=param_name).id
@@ -150,11 +259,21 @@ class P4InfoHelper(object):
     def get_action_param_name(self, action_name, param_id):
         return self.get_action_param(action_name, id=param_id).name
 
-    def get_action_param_pb(self, action_name, param_name, value):
+    def set_action_param_kind(self, action_name, param_name, kind):
+        "Declares the kind of values of an action param, see set_match_field_kind()"
         p4info_param = self.get_action_param(action_name, param_name)
-        p4runtime_param = p4runtime_pb2.Action.Param()
+        self._action_param_encoders[(action_name, param_name)] = \
+            makeEncoder(p4info_param.bitwidth, kind)
+
+    def _fillActionParam(self, p4runtime_param, action_name, param_name, value):
+        p4info_param = self.get_action_param(action_name, param_name)
+        encode = self._action_param_encoders[(action_name, param_name)]
         p4runtime_param.param_id = p4info_param.id
-        p4runtime_param.value = encode(value, p4info_param.bitwidth)
+        p4runtime_param.value = encode(value)
+
+    def get_action_param_pb(self, action_name, param_name, value):
+        p4runtime_param = p4runtime_pb2.Action.Param()
+        self._fillActionParam(p4runtime_param, action_name, param_name, value)
         return p4runtime_param
 
     def buildTableEntry(self,
@@ -164,6 +283,8 @@ class P4InfoHelper(object):
                         action_name=None,
                         action_params=None,
                         priority=None):
+        # fields and params are encoded into the entry itself, not built
+        # as messages of their own and copied in
         table_entry = p4runtime_pb2.TableEntry()
         table_entry.table_id = self.get_tables_id(table_name)
 
@@ -171,10 +292,9 @@ class P4InfoHelper(object):
             table_entry.priority = priority
 
         if match_fields:
-            table_entry.match.extend([
-                self.get_match_field_pb(table_name, match_field_name, value)
-                for match_field_name, value in match_fields.items()
-            ])
+            for match_field_name, value in match_fields.items():
+                self._fillMatchField(table_entry.match.add(), table_name,
+                                     match_field_name, value)
 
         if default_action:
             table_entry.is_default_action = True
@@ -183,10 +303,9 @@ class P4InfoHelper(object):
             action = table_entry.action.action
             action.action_id = self.get_actions_id(action_name)
             if action_params:
-                action.params.extend([
-                    self.get_action_param_pb(action_name, field_name, value)
-                    for field_name, value in action_params.items()
-                ])
+                for field_name, value in action_params.items():
+                    self._fillActionParam(action.params.add(), action_name,
+                                          field_name, value)
         return table_entry
 
     def buildMulticastGroupEntry(self, multicast_group_id, replicas):
@@ -18,16 +18,29 @@ import argparse
 import json
 import os
 import sys
+import threading
+import time
 
 from . import bmv2
 from . import helper
+from .error_utils import P4RuntimeWriteError
+from .switch import (WRITE_BATCH_SIZE, buildTableEntryUpdate,
+                     buildPREEntryUpdate)
 
 
+# switches may be programmed by several threads at the same time, the lines
+# of each one are prefixed with its name or address
+_log_context = threading.local()
+
+def _log_prefix():
+    prefix = getattr(_log_context, 'prefix', None)
+    return '' if prefix is None else '[%s]' % prefix
+
 def error(msg):
-    print(' - ERROR! ' + msg, file=sys.stderr)
+    print(_log_prefix() + ' - ERROR! ' + msg, file=sys.stderr)
 
 def info(msg):
-    print(' - ' + msg, file=sys.stdout)
+    print(_log_prefix() + ' - ' + msg, file=sys.stdout)
 
 
 class ConfException(Exception):
@@ -49,6 +62,9 @@ def main():
     parser.add_argument("-c", '--runtime-conf-file',
                         help="path to input runtime configuration file (JSON)",
                         type=str, action="store", required=True)
+    parser.add_argument('-b', '--batch-size',
+                        help='number of entries written with one P4Runtime Write request',
+                        type=int, action="store", default=WRITE_BATCH_SIZE)
 
     args = parser.parse_args()
 
@@ -60,7 +76,8 @@ def main():
                        device_id=args.device_id,
                        sw_conf_file=sw_conf_file,
                        workdir=workdir,
-                       proto_dump_fpath=args.proto_dump_file)
+                       proto_dump_fpath=args.proto_dump_file,
+                       batch_size=args.batch_size)
 
 
 def check_switch_conf(sw_conf, workdir):
@@ -88,7 +105,19 @@ def check_switch_conf(sw_conf, workdir):
             raise ConfException("file does not exist %s" % real_path)
 
 
-def program_switch(addr, device_id, sw_conf_file, workdir, proto_dump_fpath):
+def program_switch(addr, device_id, sw_conf_file, workdir, proto_dump_fpath,
+                   batch_size=WRITE_BATCH_SIZE, name=None):
+    """ name: name of the switch in log lines, None for addr """
+    _log_context.prefix = name if name is not None else addr
+    try:
+        _program_switch(addr, device_id, sw_conf_file, workdir,
+                        proto_dump_fpath, batch_size)
+    finally:
+        _log_context.prefix = None
+
+
+def _program_switch(addr, device_id, sw_conf_file, workdir, proto_dump_fpath,
+                    batch_size):
     sw_conf = json_load_byteified(sw_conf_file)
     try:
         check_switch_conf(sw_conf=sw_conf, workdir=workdir)
@@ -124,29 +153,49 @@ def program_switch(addr, device_id, sw_conf_file, workdir, proto_dump_fpath):
         if 'table_entries' in sw_conf:
             table_entries = sw_conf['table_entries']
             info("Inserting %d table entries..." % len(table_entries))
+            updates = []
             for entry in table_entries:
                 info(tableEntryToString(entry))
-                insertTableEntry(sw, entry, p4info_helper)
+                updates.append(buildTableEntryUpdate(
+                    buildTableEntry(entry, p4info_helper)))
+            writeUpdates(sw, updates, batch_size)
 
         if 'multicast_group_entries' in sw_conf:
             group_entries = sw_conf['multicast_group_entries']
             info("Inserting %d group entries..." % len(group_entries))
+            updates = []
             for entry in group_entries:
                 info(groupEntryToString(entry))
-                insertMulticastGroupEntry(sw, entry, p4info_helper)
+                updates.append(buildPREEntryUpdate(
+                    buildMulticastGroupEntry(entry, p4info_helper)))
+            writeUpdates(sw, updates, batch_size)
 
         if 'clone_session_entries' in sw_conf:
             clone_entries = sw_conf['clone_session_entries']
             info("Inserting %d clone entries..." % len(clone_entries))
+            updates = []
             for entry in clone_entries:
                 info(cloneEntryToString(entry))
-                insertCloneGroupEntry(sw, entry, p4info_helper)
+                updates.append(buildPREEntryUpdate(
+                    buildCloneGroupEntry(entry, p4info_helper)))
+            writeUpdates(sw, updates, batch_size)
 
     finally:
         sw.shutdown()
 
 
-def insertTableEntry(sw, flow, p4info_helper):
+def writeUpdates(sw, updates, batch_size):
+    begin = time.monotonic()
+    try:
+        sw.WriteUpdates(updates, batch_size=batch_size)
+    except P4RuntimeWriteError as e:
+        error(str(e))
+        raise
+    info("Wrote %d entries in %.1f ms" % (
+        len(updates), (time.monotonic() - begin) * 1000))
+
+
+def buildTableEntry(flow, p4info_helper):
     table_name = flow['table']
     match_fields = flow.get('match') # None if not found
     action_name = flow['action_name']
@@ -154,7 +203,7 @@ def insertTableEntry(sw, flow, p4info_helper):
     action_params = flow['action_params']
     priority = flow.get('priority')  # None if not found
 
-    table_entry = p4info_helper.buildTableEntry(
+    return p4info_helper.buildTableEntry(
         table_name=table_name,
         match_fields=match_fields,
         default_action=default_action,
@@ -162,7 +211,9 @@ def insertTableEntry(sw, flow, p4info_helper):
         action_params=action_params,
         priority=priority)
 
-    sw.WriteTableEntry(table_entry)
+
+def insertTableEntry(sw, flow, p4info_helper):
+    sw.WriteTableEntry(buildTableEntry(flow, p4info_helper))
 
 
 def json_load_byteified(file_handle):
@@ -219,14 +270,18 @@ def cloneEntryToString(rule):
     ports_str = ', '.join(replicas)
     return 'Clone Session {0} => ({1}) ({2})'.format(clone_id, ports_str, packet_length_bytes)
 
+def buildMulticastGroupEntry(rule, p4info_helper):
+    return p4info_helper.buildMulticastGroupEntry(rule["multicast_group_id"], rule['replicas'])
+
+def buildCloneGroupEntry(rule, p4info_helper):
+    return p4info_helper.buildCloneSessionEntry(rule['clone_session_id'], rule['replicas'],
+                                                rule.get('packet_length_bytes', 0))
+
 def insertMulticastGroupEntry(sw, rule, p4info_helper):
-    mc_entry = p4info_helper.buildMulticastGroupEntry(rule["multicast_group_id"], rule['replicas'])
-    sw.WritePREEntry(mc_entry)
+    sw.WritePREEntry(buildMulticastGroupEntry(rule, p4info_helper))
 
 def insertCloneGroupEntry(sw, rule, p4info_helper):
-    clone_entry = p4info_helper.buildCloneSessionEntry(rule['clone_session_id'], rule['replicas'],
-                                                       rule.get('packet_length_bytes', 0))
-    sw.WritePREEntry(clone_entry)
+    sw.WritePREEntry(buildCloneGroupEntry(rule, p4info_helper))
 
 
 if __name__ == '__main__':
@@ -21,7 +21,11 @@ from p4.v1 import p4runtime_pb2
 from p4.v1 import p4runtime_pb2_grpc
 from p4.tmp import p4config_pb2
 
+from .error_utils import P4RuntimeWriteError
+
 MSG_LOG_MAX_LEN = 1024
+# Updates packed into one WriteRequest by WriteUpdates()
+WRITE_BATCH_SIZE = 256
 
 # List of all active connections
 connections = []
@@ -30,6 +34,85 @@ def ShutdownAllSwitchConnections():
     for c in connections:
         c.shutdown()
 
+def buildArbitrationRequest(device_id):
+    request = p4runtime_pb2.StreamMessageRequest()
+    request.arbitration.device_id = device_id
+    request.arbitration.election_id.high = 0
+    request.arbitration.election_id.low = 1
+    return request
+
+def buildPipelineConfigRequest(device_id, p4info, device_config):
+    request = p4runtime_pb2.SetForwardingPipelineConfigRequest()
+    request.election_id.low = 1
+    request.device_id = device_id
+    config = request.config
+
+    config.p4info.CopyFrom(p4info)
+    config.p4_device_config = device_config.SerializeToString()
+
+    request.action = p4runtime_pb2.SetForwardingPipelineConfigRequest.VERIFY_AND_COMMIT
+    return request
+
+def buildTableEntryUpdate(table_entry):
+    update = p4runtime_pb2.Update()
+    if table_entry.is_default_action:
+        update.type = p4runtime_pb2.Update.MODIFY
+    else:
+        update.type = p4runtime_pb2.Update.INSERT
+    update.entity.table_entry.CopyFrom(table_entry)
+    return update
+
+def buildPREEntryUpdate(pre_entry):
+    update = p4runtime_pb2.Update()
+    update.type = p4runtime_pb2.Update.INSERT
+    update.entity.packet_replication_engine_entry.CopyFrom(pre_entry)
+    return update
+
+def buildWriteRequest(device_id, updates):
+    request = p4runtime_pb2.WriteRequest()
+    request.device_id = device_id
+    request.election_id.low = 1
+    request.updates.extend(updates)
+    return request
+
+def buildTableEntryWriteRequest(device_id, table_entry):
+    return buildWriteRequest(device_id, [buildTableEntryUpdate(table_entry)])
+
+def buildPREEntryWriteRequest(device_id, pre_entry):
+    return buildWriteRequest(device_id, [buildPREEntryUpdate(pre_entry)])
+
+def splitUpdates(updates, batch_size):
+    """Yields (index of the first update, list of updates) of each batch"""
+    if batch_size < 1:
+        raise ValueError('parameter batch_size error!')
+    updates = list(updates)
+    for begin in range(0, len(updates), batch_size):
+        yield begin, updates[begin:begin + batch_size]
+
+def buildTableEntriesReadRequest(device_id, table_id=None):
+    request = p4runtime_pb2.ReadRequest()
+    request.device_id = device_id
+    entity = request.entities.add()
+    table_entry = entity.table_entry
+    if table_id is not None:
+        table_entry.table_id = table_id
+    else:
+        table_entry.table_id = 0
+    return request
+
+def buildCountersReadRequest(device_id, counter_id=None, index=None):
+    request = p4runtime_pb2.ReadRequest()
+    request.device_id = device_id
+    entity = request.entities.add()
+    counter_entry = entity.counter_entry
+    if counter_id is not None:
+        counter_entry.counter_id = counter_id
+    else:
+        counter_entry.counter_id = 0
+    if index is not None:
+        counter_entry.index.index = index
+    return request
+
 class SwitchConnection(object):
 
     def __init__(self, name=None, address='127.0.0.1:50051', device_id=0,
@@ -57,10 +140,7 @@ class SwitchConnection(object):
         self.stream_msg_resp.cancel()
 
     def MasterArbitrationUpdate(self, dry_run=False, **kwargs):
-        request = p4runtime_pb2.StreamMessageRequest()
-        request.arbitration.device_id = self.device_id
-        request.arbitration.election_id.high = 0
-        request.arbitration.election_id.low = 1
+        request = buildArbitrationRequest(self.device_id)
 
         if dry_run:
             print("P4Runtime MasterArbitrationUpdate: ", request)
@@ -71,44 +151,22 @@ class SwitchConnection(object):
 
     def SetForwardingPipelineConfig(self, p4info, dry_run=False, **kwargs):
         device_config = self.buildDeviceConfig(**kwargs)
-        request = p4runtime_pb2.SetForwardingPipelineConfigRequest()
-        request.election_id.low = 1
-        request.device_id = self.device_id
-        config = request.config
-
-        config.p4info.CopyFrom(p4info)
-        config.p4_device_config = device_config.SerializeToString()
-
-        request.action = p4runtime_pb2.SetForwardingPipelineConfigRequest.VERIFY_AND_COMMIT
+        request = buildPipelineConfigRequest(self.device_id, p4info,
+                                             device_config)
         if dry_run:
             print("P4Runtime SetForwardingPipelineConfig:", request)
         else:
             self.client_stub.SetForwardingPipelineConfig(request)
 
     def WriteTableEntry(self, table_entry, dry_run=False):
-        request = p4runtime_pb2.WriteRequest()
-        request.device_id = self.device_id
-        request.election_id.low = 1
-        update = request.updates.add()
-        if table_entry.is_default_action:
-            update.type = p4runtime_pb2.Update.MODIFY
-        else:
-            update.type = p4runtime_pb2.Update.INSERT
-        update.entity.table_entry.CopyFrom(table_entry)
+        request = buildTableEntryWriteRequest(self.device_id, table_entry)
         if dry_run:
             print("P4Runtime Write:", request)
         else:
             self.client_stub.Write(request)
 
     def ReadTableEntries(self, table_id=None, dry_run=False):
-        request = p4runtime_pb2.ReadRequest()
-        request.device_id = self.device_id
-        entity = request.entities.add()
-        table_entry = entity.table_entry
-        if table_id is not None:
-            table_entry.table_id = table_id
-        else:
-            table_entry.table_id = 0
+        request = buildTableEntriesReadRequest(self.device_id, table_id)
         if dry_run:
             print("P4Runtime Read:", request)
         else:
@@ -116,16 +174,7 @@ class SwitchConnection(object):
                 yield response
 
     def ReadCounters(self, counter_id=None, index=None, dry_run=False):
-        request = p4runtime_pb2.ReadRequest()
-        request.device_id = self.device_id
-        entity = request.entities.add()
-        counter_entry = entity.counter_entry
-        if counter_id is not None:
-            counter_entry.counter_id = counter_id
-        else:
-            counter_entry.counter_id = 0
-        if index is not None:
-            counter_entry.index.index = index
+        request = buildCountersReadRequest(self.device_id, counter_id, index)
         if dry_run:
             print("P4Runtime Read:", request)
         else:
@@ -134,17 +183,29 @@ class SwitchConnection(object):
 
 
     def WritePREEntry(self, pre_entry, dry_run=False):
-        request = p4runtime_pb2.WriteRequest()
-        request.device_id = self.device_id
-        request.election_id.low = 1
-        update = request.updates.add()
-        update.type = p4runtime_pb2.Update.INSERT
-        update.entity.packet_replication_engine_entry.CopyFrom(pre_entry)
+        request = buildPREEntryWriteRequest(self.device_id, pre_entry)
         if dry_run:
             print("P4Runtime Write:", request)
         else:
             self.client_stub.Write(request)
 
+    def WriteUpdates(self, updates, batch_size=WRITE_BATCH_SIZE,
+                     dry_run=False):
+        """Writes updates, e.g. from buildTableEntryUpdate(), with one RPC
+           per batch_size updates. Raises P4RuntimeWriteError with the
+           failed updates of the first failing batch, later batches are
+           not written.
+        """
+        for begin, batch in splitUpdates(updates, batch_size):
+            request = buildWriteRequest(self.device_id, batch)
+            if dry_run:
+                print("P4Runtime Write:", request)
+                continue
+            try:
+                self.client_stub.Write(request)
+            except grpc.RpcError as e:
+                raise P4RuntimeWriteError(e, begin, batch) from e
+
 class GrpcRequestLogger(grpc.UnaryUnaryClientInterceptor,
                         grpc.UnaryStreamClientInterceptor):
     """Implementation of a gRPC interceptor that logs request to a file"""
@@ -0,0 +1,179 @@
+# Copyright 2017-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# asyncio version of SwitchConnection, on grpc.aio.
+#
+# All connections of a controller share one event loop, so dozens of
+# switches are programmed and polled concurrently without a thread per
+# switch, e.g. with AsyncBmv2SwitchConnection of bmv2_aio:
+#
+#     async def setup(sw):
+#         await sw.MasterArbitrationUpdate()
+#         await sw.SetForwardingPipelineConfig(p4info=p4info,
+#                                              bmv2_json_file_path=json_path)
+#         for table_entry in table_entries:
+#             await sw.WriteTableEntry(table_entry)
+#
+#     async def main():
+#         switches = [AsyncBmv2SwitchConnection(address='127.0.0.1:%d' % port,
+#                                               device_id=device_id)
+#                     for port, device_id in ...]
+#         try:
+#             await asyncio.gather(*[setup(sw) for sw in switches])
+#         finally:
+#             await ShutdownAllAsyncSwitchConnections()
+#
+#     asyncio.run(main())
+#
+# Connections must be created inside the running event loop.
+from abc import abstractmethod
+
+import grpc
+from p4.v1 import p4runtime_pb2_grpc
+from p4.tmp import p4config_pb2
+
+from .error_utils import P4RuntimeWriteError
+from .switch import (GrpcRequestLogger, WRITE_BATCH_SIZE,
+                     buildArbitrationRequest, buildPipelineConfigRequest,
+                     buildTableEntryWriteRequest, buildPREEntryWriteRequest,
+                     buildWriteRequest, splitUpdates,
+                     buildTableEntriesReadRequest, buildCountersReadRequest)
+
+# List of all active asyncio connections
+connections = []
+
+async def ShutdownAllAsyncSwitchConnections():
+    for c in list(connections):
+        await c.shutdown()
+
+class AsyncSwitchConnection(object):
+    """SwitchConnection whose RPC methods are coroutines and whose reads
+       are async generators. The stream channel is opened by
+       MasterArbitrationUpdate().
+    """
+
+    def __init__(self, name=None, address='127.0.0.1:50051', device_id=0,
+                 proto_dump_file=None):
+        self.name = name
+        self.address = address
+        self.device_id = device_id
+        self.p4info = None
+        interceptors = None
+        if proto_dump_file is not None:
+            interceptors = [AsyncGrpcRequestLogger(proto_dump_file)]
+        self.channel = grpc.aio.insecure_channel(self.address,
+                                                 interceptors=interceptors)
+        self.client_stub = p4runtime_pb2_grpc.P4RuntimeStub(self.channel)
+        self.stream_channel = None
+        self.proto_dump_file = proto_dump_file
+        connections.append(self)
+
+    @abstractmethod
+    def buildDeviceConfig(self, **kwargs):
+        return p4config_pb2.P4DeviceConfig()
+
+    async def shutdown(self):
+        if self.stream_channel is not None:
+            self.stream_channel.cancel()
+            self.stream_channel = None
+        await self.channel.close()
+        if self in connections:
+            connections.remove(self)
+
+    async def MasterArbitrationUpdate(self, dry_run=False, **kwargs):
+        request = buildArbitrationRequest(self.device_id)
+
+        if dry_run:
+            print("P4Runtime MasterArbitrationUpdate: ", request)
+        else:
+            if self.stream_channel is None:
+                self.stream_channel = self.client_stub.StreamChannel()
+            await self.stream_channel.write(request)
+            return await self.stream_channel.read() # just one
+
+    async def SetForwardingPipelineConfig(self, p4info, dry_run=False,
+                                          **kwargs):
+        device_config = self.buildDeviceConfig(**kwargs)
+        request = buildPipelineConfigRequest(self.device_id, p4info,
+                                             device_config)
+        if dry_run:
+            print("P4Runtime SetForwardingPipelineConfig:", request)
+        else:
+            await self.client_stub.SetForwardingPipelineConfig(request)
+
+    async def WriteTableEntry(self, table_entry, dry_run=False):
+        request = buildTableEntryWriteRequest(self.device_id, table_entry)
+        if dry_run:
+            print("P4Runtime Write:", request)
+        else:
+            await self.client_stub.Write(request)
+
+    async def ReadTableEntries(self, table_id=None, dry_run=False):
+        request = buildTableEntriesReadRequest(self.device_id, table_id)
+        if dry_run:
+            print("P4Runtime Read:", request)
+        else:
+            async for response in self.client_stub.Read(request):
+                yield response
+
+    async def ReadCounters(self, counter_id=None, index=None, dry_run=False):
+        request = buildCountersReadRequest(self.device_id, counter_id, index)
+        if dry_run:
+            print("P4Runtime Read:", request)
+        else:
+            async for response in self.client_stub.Read(request):
+                yield response
+
+    async def WritePREEntry(self, pre_entry, dry_run=False):
+        request = buildPREEntryWriteRequest(self.device_id, pre_entry)
+        if dry_run:
+            print("P4Runtime Write:", request)
+        else:
+            await self.client_stub.Write(request)
+
+    async def WriteUpdates(self, updates, batch_size=WRITE_BATCH_SIZE,
+                           dry_run=False):
+        """See SwitchConnection.WriteUpdates()"""
+        for begin, batch in splitUpdates(updates, batch_size):
+            request = buildWriteRequest(self.device_id, batch)
+            if dry_run:
+                print("P4Runtime Write:", request)
+                continue
+            try:
+                await self.client_stub.Write(request)
+            except grpc.RpcError as e:
+                raise P4RuntimeWriteError(e, begin, batch) from e
+
+class AsyncGrpcRequestLogger(grpc.aio.UnaryUnaryClientInterceptor,
+                             grpc.aio.UnaryStreamClientInterceptor):
+    """GrpcRequestLogger for grpc.aio channels"""
+
+    def __init__(self, log_file):
+        self.request_logger = GrpcRequestLogger(log_file)
+
+    def log_message(self, method_name, body):
+        # method names of grpc.aio call details are bytes
+        if isinstance(method_name, bytes):
+            method_name = method_name.decode()
+        self.request_logger.log_message(method_name, body)
+
+    async def intercept_unary_unary(self, continuation, client_call_details,
+                                    request):
+        self.log_message(client_call_details.method, request)
+        return await continuation(client_call_details, request)
+
+    async def intercept_unary_stream(self, continuation, client_call_details,
+                                     request):
+        self.log_message(client_call_details.method, request)
+        return await continuation(client_call_details, request)
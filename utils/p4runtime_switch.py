@@ -71,7 +71,9 @@ class P4RuntimeSwitch(P4Switch):
             exit(1)
 
         self.verbose = verbose
-        logfile = "/tmp/p4s.{}.log".format(self.name)
+        # next to log_file, so that each run keeps its own logs
+        log_dir = os.path.dirname(log_file) if log_file else "/tmp"
+        logfile = os.path.join(log_dir, "p4s.{}.log".format(self.name))
         self.output = open(logfile, 'w')
         self.pcap_dump = pcap_dump
         self.enable_debugger = enable_debugger
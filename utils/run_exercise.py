@@ -20,7 +20,8 @@
 # environment used by the P4 tutorial.
 #
 import os, sys, json, subprocess, re, argparse
-from time import sleep
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from p4_mininet import P4Switch, P4Host
 
@@ -69,8 +70,12 @@ def configureP4Switch(**switch_args):
 class ExerciseTopo(Topo):
     """ The mininet topology class for the P4 tutorial exercises.
     """
-    def __init__(self, hosts, switches, links, log_dir, bmv2_exe, pcap_dir, **opts):
+    def __init__(self, hosts, switches, links, log_dir, bmv2_exe, pcap_dir,
+                 node_prefix='', **opts):
         Topo.__init__(self, **opts)
+        # prepended to every node name, so that interfaces of several
+        # mininet instances running at once do not collide
+        self.node_prefix = node_prefix
         host_links = []
         switch_links = []
 
@@ -91,22 +96,22 @@ class ExerciseTopo(Topo):
             else:
                 # add default switch
                 switchClass = None
-            self.addSwitch(sw, log_file="%s/%s.log" %(log_dir, sw), cls=switchClass)
+            self.addSwitch(node_prefix + sw, log_file="%s/%s.log" %(log_dir, sw), cls=switchClass)
 
         for link in host_links:
             host_name = link['node1']
             sw_name, sw_port = self.parse_switch_node(link['node2'])
             host_ip = hosts[host_name]['ip']
             host_mac = hosts[host_name]['mac']
-            self.addHost(host_name, ip=host_ip, mac=host_mac)
-            self.addLink(host_name, sw_name,
+            self.addHost(node_prefix + host_name, ip=host_ip, mac=host_mac)
+            self.addLink(node_prefix + host_name, node_prefix + sw_name,
                          delay=link['latency'], bw=link['bandwidth'],
                          port2=sw_port)
 
         for link in switch_links:
             sw1_name, sw1_port = self.parse_switch_node(link['node1'])
             sw2_name, sw2_port = self.parse_switch_node(link['node2'])
-            self.addLink(sw1_name, sw2_name,
+            self.addLink(node_prefix + sw1_name, node_prefix + sw2_name,
                         port1=sw1_port, port2=sw2_port,
                         delay=link['latency'], bw=link['bandwidth'])
 
@@ -136,10 +141,16 @@ class ExerciseRunner:
             switch_json : string // json of the compiled p4 example
             bmv2_exe    : string // name or path of the p4 switch binary
 
+            node_prefix : string // prepended to mininet node names
+            program_workers : int // switches programmed at the same time
+
             topo : Topo object   // The mininet topology instance
             net : Mininet object // The mininet instance
 
     """
+    # default bound of switches programmed at the same time
+    PROGRAM_WORKERS = 8
+
     def logger(self, *items):
         if not self.quiet:
             print(' '.join(items))
@@ -155,7 +166,9 @@ class ExerciseRunner:
     def __init__(self, topo_file, log_dir, pcap_dir,
                        switch_json, bmv2_exe='simple_switch', 
                        quiet=False, disable_debug=False, 
-                       no_pcap=False, exp=None, wait=1, script_dir=None):
+                       no_pcap=False, exp=None, wait=1, script_dir=None,
+                       node_prefix='', grpc_port=None, thrift_port=None,
+                       device_id=None, program_workers=None):
         """ Initializes some attributes and reads the topology json. Does not
             actually run the exercise. Use run_exercise() for that.
 
@@ -167,6 +180,15 @@ class ExerciseRunner:
                 switch_json : string  // Path to a compiled p4 json for bmv2
                 bmv2_exe    : string  // Path to the p4 behavioral binary
                 quiet : bool          // Enable/disable script debug messages
+                node_prefix : string  // Prefix of mininet node names
+                grpc_port : int       // First gRPC port, None for 50051
+                thrift_port : int     // First thrift port, None for 9090
+                device_id : int       // First switch device id, None for 0
+                program_workers : int // Switches programmed at the same time,
+                                         None for min(PROGRAM_WORKERS, #switches)
+
+            node_prefix to device_id isolate mininet instances running at the
+            same time.
         """
 
         self.disable_debug = disable_debug
@@ -174,6 +196,14 @@ class ExerciseRunner:
         self.exp = exp
         self.wait = wait
         self.script_dir = script_dir
+        self.node_prefix = node_prefix
+        self.program_workers = program_workers
+        if grpc_port is not None:
+            P4RuntimeSwitch.next_grpc_port = grpc_port
+        if thrift_port is not None:
+            P4RuntimeSwitch.next_thrift_port = thrift_port
+        if device_id is not None:
+            P4Switch.device_id = device_id
         if self.script_dir is not None and self.script_dir[-1] != '/':
             self.script_dir = self.script_dir + '/'
         self.quiet = quiet
@@ -203,26 +233,30 @@ class ExerciseRunner:
         """
         # Initialize mininet with the topology specified by the config
         self.create_network()
+        # start() of each switch returns once its thrift/gRPC port listens
         self.net.start()
-        sleep(1)
 
-        # some programming that must happen after the net has started
+        # some programming that must happen after the net has started,
+        # returns once every switch is configured
         self.program_hosts()
         self.program_switches()
 
-        # wait for that to finish. Not sure how to do this better
-        sleep(1)
-
         if self.exp is None:
             self.do_net_cli()
         else:
             print('[ExerciseRunner]: Start experiment {}.'.format(self.exp))
             if self.exp == 'IperfTest':
-                iperf_test = mn_exp.IperfTest(self.net, len(self.hosts))
+                iperf_test = mn_exp.IperfTest(self.net, len(self.hosts),
+                                              self.node_prefix)
                 iperf_test.run_exp(self.script_dir, self.wait)
             elif self.exp == 'DumbbellExp':
-                dumbbell_exp = mn_exp.DumbbellExp(self.net, len(self.hosts))
+                dumbbell_exp = mn_exp.DumbbellExp(self.net, len(self.hosts),
+                                                  self.node_prefix)
                 dumbbell_exp.run_exp(self.script_dir, self.wait)
+            elif self.exp == 'FlowScheduleExp':
+                flow_schedule_exp = mn_exp.FlowScheduleExp(
+                    self.net, len(self.hosts), self.node_prefix)
+                flow_schedule_exp.run_exp(self.script_dir, self.wait)
             else:
                 print('[ExerciseRunner]: Experiment {} not exist.'.format(self.exp))
 
@@ -274,7 +308,8 @@ class ExerciseRunner:
                                 log_console=not self.disable_debug,
                                 pcap_dump=False if self.no_pcap else self.pcap_dir) # self.pcap_dir
 
-        self.topo = ExerciseTopo(self.hosts, self.switches, self.links, self.log_dir, self.bmv2_exe, self.pcap_dir)
+        self.topo = ExerciseTopo(self.hosts, self.switches, self.links, self.log_dir, self.bmv2_exe, self.pcap_dir,
+                                 self.node_prefix)
 
         self.net = Mininet(topo = self.topo,
                       link = TCLink,
@@ -286,7 +321,7 @@ class ExerciseRunner:
         """ This method will use P4Runtime to program the switch using the
             content of the runtime JSON file as input.
         """
-        sw_obj = self.net.get(sw_name)
+        sw_obj = self.net.get(self.node_prefix + sw_name)
         grpc_port = sw_obj.grpc_port
         device_id = sw_obj.device_id
         runtime_json = sw_dict['runtime_json']
@@ -298,15 +333,16 @@ class ExerciseRunner:
                 device_id=device_id,
                 sw_conf_file=sw_conf_file,
                 workdir=os.getcwd(),
-                proto_dump_fpath=outfile)
+                proto_dump_fpath=outfile,
+                name=sw_name)
 
     def program_switch_cli(self, sw_name, sw_dict):
         """ This method will start up the CLI and use the contents of the
-            command files as input.
+            command files as input. Returns the CLI process.
         """
         cli = 'simple_switch_CLI'
         # get the port for this particular switch's thrift server
-        sw_obj = self.net.get(sw_name)
+        sw_obj = self.net.get(self.node_prefix + sw_name)
         thrift_port = sw_obj.thrift_port
 
         cli_input_commands = sw_dict['cli_input']
@@ -314,25 +350,85 @@ class ExerciseRunner:
         with open(cli_input_commands, 'r') as fin:
             cli_outfile = '%s/%s_cli_output.log'%(self.log_dir, sw_name)
             with open(cli_outfile, 'w') as fout:
-                subprocess.Popen([cli, '--thrift-port', str(thrift_port)],
-                                 stdin=fin, stdout=fout)
+                return subprocess.Popen([cli, '--thrift-port',
+                                         str(thrift_port)],
+                                        stdin=fin, stdout=fout)
+
+    def program_switch(self, sw_name, sw_dict):
+        """ Programs one switch with the BMv2 CLI and/or P4Runtime.
+            Returns (CLI process or None, programming time in seconds).
+        """
+        begin = time.monotonic()
+        cli_proc = None
+        try:
+            if 'cli_input' in sw_dict:
+                cli_proc = self.program_switch_cli(sw_name, sw_dict)
+            if 'runtime_json' in sw_dict:
+                self.program_switch_p4runtime(sw_name, sw_dict)
+        except Exception:
+            # the caller only waits for CLIs of switches that succeeded
+            if cli_proc is not None:
+                cli_proc.wait()
+            raise
+        return cli_proc, time.monotonic() - begin
 
     def program_switches(self):
         """ This method will program each switch using the BMv2 CLI and/or
             P4Runtime, depending if any command or runtime JSON files were
             provided for the switches.
+
+            Switches are programmed by a pool of program_workers threads.
+            As with programming one switch after another, once a switch
+            fails, switches not started yet are not programmed, and the
+            error of the first failed switch, in topology order, is raised.
         """
-        for sw_name, sw_dict in self.switches.items():
-            if 'cli_input' in sw_dict:
-                self.program_switch_cli(sw_name, sw_dict)
-            if 'runtime_json' in sw_dict:
-                self.program_switch_p4runtime(sw_name, sw_dict)
+        sw_names = list(self.switches)
+        if len(sw_names) == 0:
+            return
+        workers = self.program_workers
+        if workers is None:
+            workers = min(self.PROGRAM_WORKERS, len(sw_names))
+        begin = time.monotonic()
+        results = {}
+        errors = {}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(self.program_switch, sw_name,
+                                       self.switches[sw_name]): sw_name
+                       for sw_name in sw_names}
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                sw_name = futures[future]
+                try:
+                    results[sw_name] = future.result()
+                except Exception as e:
+                    print('[ExerciseRunner]: programming switch %s failed: %s'
+                          % (sw_name, e))
+                    errors[sw_name] = e
+                    for other in futures:
+                        other.cancel()
+
+        # the CLI runs its commands file and exits
+        for sw_name in sw_names:
+            if sw_name not in results:
+                continue
+            cli_proc, seconds = results[sw_name]
+            if cli_proc is not None and cli_proc.wait() != 0:
+                self.logger('CLI of switch %s exited with %d'
+                            % (sw_name, cli_proc.returncode))
+            self.logger('Switch %s programmed in %.0f ms'
+                        % (sw_name, seconds * 1000))
+        self.logger('%d switches programmed by %d workers in %.0f ms'
+                    % (len(results), workers, (time.monotonic() - begin) * 1000))
+        for sw_name in sw_names:
+            if sw_name in errors:
+                raise errors[sw_name]
 
     def program_hosts(self):
         """ Execute any commands provided in the topology.json file on each Mininet host
         """
         for host_name, host_info in list(self.hosts.items()):
-            h = self.net.get(host_name)
+            h = self.net.get(self.node_prefix + host_name)
             if "commands" in host_info:
                 for cmd in host_info["commands"]:
                     h.cmd(cmd)
@@ -404,6 +500,17 @@ def get_args():
                         type=int, required=False, default=1)
     parser.add_argument('-s', '--script_dir', help='Experiment script dir',
                         type=str, required=False, default=None)
+    parser.add_argument('--node_prefix', help='Prefix of mininet node names',
+                        type=str, required=False, default='')
+    parser.add_argument('--grpc_port', help='First switch gRPC port',
+                        type=int, required=False, default=None)
+    parser.add_argument('--thrift_port', help='First switch thrift port',
+                        type=int, required=False, default=None)
+    parser.add_argument('--device_id', help='First switch device id',
+                        type=int, required=False, default=None)
+    parser.add_argument('--program_workers',
+                        help='Switches programmed at the same time',
+                        type=int, required=False, default=None)
     return parser.parse_args()
 
 
@@ -415,7 +522,10 @@ if __name__ == '__main__':
     exercise = ExerciseRunner(args.topo, args.log_dir, args.pcap_dir, 
                               args.switch_json, args.behavioral_exe, 
                               args.quiet, args.disable_debug, args.no_pcap, 
-                              args.exp, args.wait, args.script_dir)
+                              args.exp, args.wait, args.script_dir,
+                              args.node_prefix, args.grpc_port,
+                              args.thrift_port, args.device_id,
+                              args.program_workers)
 
     exercise.run_exercise()
 